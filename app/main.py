@@ -3,23 +3,41 @@ Flask Web Application for Property Lookup by Company Number
 With User Account System and Credits
 """
 
-from flask import Flask, Response, abort, render_template, request, jsonify, send_file, session, redirect, url_for
+from flask import Flask, Response, abort, g, render_template, request, jsonify, send_file, session, redirect, url_for, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 import os
+import re
+import bisect
 import csv
-import io
+import gzip
+import itertools
+import operator
+import orjson
 import requests
-import stripe
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import quote
 import bcrypt
 import secrets
+import tempfile
+import time
+import zlib
 import resend
 from pathlib import Path
 from rapidfuzz import fuzz, process
+from rapidfuzz import utils as fuzz_utils
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from werkzeug.http import http_date
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from functools import wraps
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from app.content import all_content, get_content, list_content
 
@@ -27,7 +45,33 @@ from app.content import all_content, get_content, list_content
 load_dotenv()
 load_dotenv('env.local')
 
+
+def _orjson_default(value):
+    """Serialize the types orjson leaves to us the same way Flask's JSON provider does"""
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify() backed by orjson; search responses carry thousands of property rows"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_PASSTHROUGH_DATETIME).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Secret key for session management
 _secret_key = os.environ.get('SECRET_KEY')
@@ -47,6 +91,14 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
 # Database URL from environment
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Connection pool sizing (PostgreSQL only). minconn is also the number of idle
+# connections psycopg2 keeps open between requests. Each warm Vercel instance
+# serves one request at a time, so keep its pool small to stay under the
+# Postgres connection limit across many instances.
+_on_vercel = bool(os.environ.get('VERCEL'))
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1 if _on_vercel else 2))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 2 if _on_vercel else 20))
+
 # Resend API for emails
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
 if RESEND_API_KEY:
@@ -76,11 +128,38 @@ SIGNUP_CREDITS = 10
 # Companies House API Key
 COMPANIES_HOUSE_API_KEY = os.environ.get('COMPANIES_HOUSE_API_KEY')
 COMPANIES_HOUSE_BASE_URL = 'https://api.company-information.service.gov.uk'
-
-# Stripe Configuration
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+# Concurrent appointment lookups per director search (one per officer, up to 15)
+CH_MAX_WORKERS = int(os.environ.get('CH_MAX_WORKERS', 8))
+# Companies House allows 600 requests per 5 minutes per API key
+CH_RATE_LIMIT_REQUESTS = 600
+CH_RATE_LIMIT_WINDOW = 300
+
+# Shared keep-alive session so concurrent Companies House calls reuse TCP/TLS
+# connections. Transient 5xx responses are retried; 429 is surfaced to the user.
+_ch_session = requests.Session()
+_ch_session.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=max(CH_MAX_WORKERS, 16),
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504], raise_on_status=False)
+))
+
+# Stripe Configuration. The SDK itself is imported on first use via get_stripe(),
+# since importing it adds roughly half a second to every serverless cold start.
+STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
 STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY')
 
+
+def get_stripe():
+    """Return the configured Stripe SDK module, importing it on first call"""
+    import stripe
+    stripe.api_key = STRIPE_SECRET_KEY
+    return stripe
+
+
+def stripe_configured():
+    """Whether a real Stripe secret key is set (checked without importing the SDK)"""
+    return bool(STRIPE_SECRET_KEY) and STRIPE_SECRET_KEY != 'sk_test_your_secret_key_here'
+
 # Pricing in pence (£1 = 100 pence, £3 = 300 pence)
 SEARCH_PRICES = {
     'name': 100,      # £1 for company name search
@@ -89,8 +168,124 @@ SEARCH_PRICES = {
     'director': 300   # £3 for director search
 }
 
-# In-memory storage for used sessions (in production, use database)
-used_sessions = set()
+# Name and address searches are '%term%' LIKE scans, so single characters are
+# rejected. Two-character postcode districts (W1, E1) are outward codes, which
+# address searches send only to the indexed postcode-prefix lookup
+MIN_PARTIAL_SEARCH_LENGTH = 2
+OUTWARD_CODE_RE = re.compile(r'[A-Z]{1,2}\d')
+
+
+def is_outward_code(value):
+    """Whether a search value is a bare postcode district such as W1, E14 or SW1"""
+    return OUTWARD_CODE_RE.fullmatch(value.strip().upper()) is not None
+
+
+def search_value_error(search_type, search_value):
+    """Reason a (stripped) search value can't be searched, or None if it's fine"""
+    if not search_value:
+        return 'Search value is required'
+    if search_type in ('name', 'address') and len(search_value) < MIN_PARTIAL_SEARCH_LENGTH:
+        return f'Please enter at least {MIN_PARTIAL_SEARCH_LENGTH} characters to search by {search_type}'
+    return None
+
+
+# Checkout line item names by search type
+SEARCH_TYPE_LABELS = {
+    'name': 'Company Name Search',
+    'number': 'Company Number Search',
+    'address': 'Address Search',
+    'director': 'Director Search'
+}
+
+# Bounded in-process record of consumed checkout sessions (oldest evicted first).
+# The payments table is the authority; this only short-circuits obvious replays.
+USED_SESSIONS_MAX = 10000
+used_sessions = OrderedDict()
+_used_sessions_lock = threading.Lock()
+
+# Per-user (or per-IP) token buckets for the routes that hit Companies House or
+# stream large exports. Kept in process, so each serverless instance limits on its own.
+RATE_LIMIT_REQUESTS = 10
+RATE_LIMIT_WINDOW = 60
+RATE_LIMIT_MAX_KEYS = 10000
+_rate_limit_buckets = OrderedDict()
+_rate_limit_lock = threading.Lock()
+
+# Rows fetched per round-trip when streaming exports from a server-side cursor
+EXPORT_ITERSIZE = 1000
+# PostgreSQL CSV exports are spooled in memory up to this size before spilling to disk
+EXPORT_COPY_SPOOL_SIZE = 8 * 1024 * 1024
+EXPORT_COPY_CHUNK_SIZE = 64 * 1024
+
+# Address/postcode searches are broad, so they never return more than this many rows
+ADDRESS_RESULT_CAP = 500
+
+# Pagination for /api/search (opt-in via the 'page' field)
+SEARCH_PAGE_SIZE_MAX = 500
+
+# A charged search stays paid for this long in the (signed) session, so its later
+# pages are served without charging again; only the newest entries are kept
+PAID_SEARCH_TTL = int(os.environ.get('PAID_SEARCH_TTL', 3600))
+PAID_SEARCHES_MAX = 20
+
+# Names fetched from the pg_trgm index for re-ranking in "did you mean" suggestions
+TRIGRAM_CANDIDATE_LIMIT = 50
+
+# In-process cache of distinct proprietor names used for fuzzy suggestions (SQLite)
+COMPANY_NAMES_CACHE_TTL = int(os.environ.get('COMPANY_NAMES_CACHE_TTL', 3600))
+# names, their default_process forms, and the processed forms in sorted order with
+# their positions for bisect prefix lookups. Rebuilt whole and published with one
+# assignment, so a reader that takes a single snapshot never mixes two loads
+CompanyNamesSnapshot = namedtuple('CompanyNamesSnapshot', 'names processed prefix_keys prefix_indexes')
+_company_names_cache = {'snapshot': CompanyNamesSnapshot((), (), (), ()), 'expires': 0}
+_company_names_lock = threading.Lock()
+
+
+class _TTLCache:
+    """Small thread-safe LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Short-lived cache of search results keyed on (search_type, search_value).
+# Director searches are never cached since they depend on live Companies House data.
+SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 300))
+_search_cache = _TTLCache(max_entries=256)
+
+# Companies House officer searches and appointment lists change slowly and the
+# API is rate limited (600 calls / 5 min), so successful responses are reused
+COMPANIES_HOUSE_CACHE_TTL = int(os.environ.get('COMPANIES_HOUSE_CACHE_TTL', 86400))
+_companies_house_cache = _TTLCache(max_entries=2048)
+
+# Paid checkout sessions can't change, so a retried search (e.g. after a metadata
+# mismatch or a failed claim) skips the Stripe round-trip
+STRIPE_SESSION_CACHE_TTL = 300
+_stripe_session_cache = _TTLCache(max_entries=1024)
 
 # For local development fallback to SQLite
 BASE_DIR = Path(__file__).parent.parent
@@ -107,25 +302,102 @@ INDEXABLE_CORE_PAGES = (
 )
 
 
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_db_pool():
+    """Get the shared PostgreSQL connection pool, creating it on first use"""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = psycopg2.pool.ThreadedConnectionPool(
+                    minconn=DB_POOL_MIN,
+                    maxconn=DB_POOL_MAX,
+                    dsn=DATABASE_URL
+                )
+    return _db_pool
+
+
 def get_db_connection():
     """Get database connection (PostgreSQL for production, SQLite for local dev)"""
     if DATABASE_URL:
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
+        return get_db_pool().getconn()
     else:
         # Fallback for local development
         import sqlite3
         conn = sqlite3.connect(LOCAL_DATABASE_PATH)
         conn.row_factory = sqlite3.Row
+        ensure_sqlite_schema(conn)
         return conn
 
 
+_sqlite_schema_checked = False
+_sqlite_schema_lock = threading.Lock()
+
+
+def ensure_sqlite_schema(conn):
+    """
+    Add and backfill proprietors.company_reg_normalized on local databases built
+    by the loader before that column existed (checked once per process)
+    """
+    global _sqlite_schema_checked
+    if _sqlite_schema_checked:
+        return
+    with _sqlite_schema_lock:
+        if _sqlite_schema_checked:
+            return
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(proprietors)")]
+        if columns and 'company_reg_normalized' not in columns:
+            print("Adding company_reg_normalized to the local proprietors table...")
+            conn.execute("ALTER TABLE proprietors ADD COLUMN company_reg_normalized TEXT NOT NULL DEFAULT ''")
+            conn.execute("""
+                UPDATE proprietors
+                SET company_reg_normalized = UPPER(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(company_registration_no), '(', ''), ')', ''), ' ', ''), '-', ''))
+                WHERE company_reg_normalized = '' AND company_registration_no IS NOT NULL
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_company_reg_normalized ON proprietors(company_reg_normalized)")
+            conn.commit()
+        _sqlite_schema_checked = True
+
+
+def release_db_connection(conn):
+    """Return a connection to the pool (PostgreSQL) or close it (SQLite)"""
+    if DATABASE_URL:
+        # Connections dropped by the server are discarded rather than reused
+        get_db_pool().putconn(conn, close=bool(conn.closed))
+    else:
+        conn.close()
+
+
+@contextmanager
+def db_connection():
+    """Context manager that borrows a connection and always gives it back"""
+    conn = get_db_connection()
+    try:
+        yield conn
+    except Exception:
+        if not getattr(conn, 'closed', False):
+            conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
+
+
+def _sqlite_dict_row(cursor, row):
+    """SQLite row factory producing plain dicts, matching RealDictCursor rows"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
 def dict_cursor(conn):
-    """Get appropriate cursor based on connection type"""
+    """Get a cursor whose rows are dicts on both PostgreSQL and SQLite"""
     if DATABASE_URL:
         return conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     else:
-        return conn.cursor()
+        cursor = conn.cursor()
+        cursor.row_factory = _sqlite_dict_row
+        return cursor
 
 
 @app.context_processor
@@ -220,6 +492,10 @@ def render_content_detail(section, slug):
 # NORMALIZATION HELPERS (Single Source of Truth)
 # ============================================
 
+# Characters dropped from company registration numbers, removed in one translate() pass
+_COMPANY_REG_STRIP = str.maketrans('', '', '() -')
+
+
 def normalize_company_reg(value):
     """
     Normalize company registration number - SINGLE SOURCE OF TRUTH
@@ -229,7 +505,7 @@ def normalize_company_reg(value):
     """
     if not value:
         return ''
-    return value.strip().upper().replace('(', '').replace(')', '').replace(' ', '').replace('-', '')
+    return value.strip().upper().translate(_COMPANY_REG_STRIP)
 
 
 def normalize_text_upper(value):
@@ -255,28 +531,52 @@ def verify_password(password, password_hash):
     return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
 
 
+# Same cost factor as hash_password(); checked against when the email has no
+# account so failed logins take as long whether or not the user exists
+DUMMY_PASSWORD_HASH = '$2b$12$eU/8yX8J1JtdJT71FYrhA.EEBVlWndQWeSR8HVAXoAGPFG69ODBH2'
+
+
+# One '@', no whitespace, and a dot in the domain part
+_email_re = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+
+
+def is_valid_email(email):
+    """Basic shape check for an email address (deliverability is proven by the magic link)"""
+    return _email_re.fullmatch(email) is not None
+
+
 def generate_token():
     """Generate a secure random token"""
     return secrets.token_urlsafe(32)
 
 
 def get_current_user():
-    """Get the current logged-in user from session"""
+    """Get the current logged-in user from session, loaded at most once per request"""
     user_id = session.get('user_id')
     if not user_id:
         return None
     
+    # Keyed on user_id so logging in or out mid-request isn't masked
+    cached = g.get('current_user')
+    if cached is not None and cached[0] == user_id:
+        return cached[1]
+    user = _load_user(user_id)
+    g.current_user = (user_id, user)
+    return user
+
+
+def _load_user(user_id):
+    """Fetch a user's account row by id"""
     try:
-        conn = get_db_connection()
-        cursor = dict_cursor(conn)
+        with db_connection() as conn:
+            cursor = dict_cursor(conn)
         
-        if DATABASE_URL:
-            cursor.execute("SELECT id, email, credits, is_unlimited, email_verified, created_at, last_login FROM users WHERE id = %s", (user_id,))
-        else:
-            cursor.execute("SELECT id, email, credits, is_unlimited, email_verified, created_at, last_login FROM users WHERE id = ?", (user_id,))
+            if DATABASE_URL:
+                cursor.execute("SELECT id, email, credits, is_unlimited, email_verified, created_at, last_login FROM users WHERE id = %s", (user_id,))
+            else:
+                cursor.execute("SELECT id, email, credits, is_unlimited, email_verified, created_at, last_login FROM users WHERE id = ?", (user_id,))
         
-        user = cursor.fetchone()
-        conn.close()
+            user = cursor.fetchone()
         
         if user:
             return dict(user) if hasattr(user, 'keys') else {
@@ -301,42 +601,86 @@ def login_required(f):
     return decorated_function
 
 
+def rate_limit_key():
+    """Identify the caller for rate limiting: the logged-in user, else the client IP"""
+    user_id = session.get('user_id')
+    if user_id:
+        return f"user:{user_id}"
+    # Vercel puts the real client address first in X-Forwarded-For. Anywhere else
+    # the header is client-controlled, so only the socket address is trusted
+    if _on_vercel:
+        forwarded_for = request.headers.get('X-Forwarded-For', '')
+        return f"ip:{forwarded_for.split(',')[0].strip() or request.remote_addr}"
+    return f"ip:{request.remote_addr}"
+
+
+def take_rate_limit_token(key, capacity, refill_per_second):
+    """
+    Take one token from the bucket for key. Returns 0 when the request may proceed,
+    otherwise the number of seconds until a token is available.
+    """
+    now = time.monotonic()
+    with _rate_limit_lock:
+        tokens, updated = _rate_limit_buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        wait = 0 if tokens >= 1 else (1 - tokens) / refill_per_second
+        if not wait:
+            tokens -= 1
+        _rate_limit_buckets[key] = (tokens, now)
+        while len(_rate_limit_buckets) > RATE_LIMIT_MAX_KEYS:
+            _rate_limit_buckets.popitem(last=False)
+    return wait
+
+
+def rate_limited(f):
+    """Decorator allowing RATE_LIMIT_REQUESTS calls per RATE_LIMIT_WINDOW seconds per caller"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = (f.__name__, rate_limit_key())
+        wait = take_rate_limit_token(key, RATE_LIMIT_REQUESTS, RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW)
+        if wait:
+            response = jsonify({'success': False, 'error': 'Too many requests. Please wait a moment and try again.'})
+            response.headers['Retry-After'] = str(int(wait) + 1)
+            return response, 429
+        return f(*args, **kwargs)
+    return decorated_function
+
+
 def create_user(email, password=None):
     """Create a new user with initial credits"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        password_hash = hash_password(password) if password else None
-        
-        if DATABASE_URL:
-            cursor.execute("""
-                INSERT INTO users (email, password_hash, credits, email_verified)
-                VALUES (%s, %s, %s, %s)
-                RETURNING id
-            """, (email.lower(), password_hash, SIGNUP_CREDITS, password is not None))
-            user_id = cursor.fetchone()[0]
-        else:
-            cursor.execute("""
-                INSERT INTO users (email, password_hash, credits, email_verified)
-                VALUES (?, ?, ?, ?)
-            """, (email.lower(), password_hash, SIGNUP_CREDITS, password is not None))
-            user_id = cursor.lastrowid
-        
-        # Record the signup bonus in transactions
-        if DATABASE_URL:
-            cursor.execute("""
-                INSERT INTO credit_transactions (user_id, amount, transaction_type, description)
-                VALUES (%s, %s, %s, %s)
-            """, (user_id, SIGNUP_CREDITS, 'signup_bonus', 'Welcome bonus - 10 free credits'))
-        else:
-            cursor.execute("""
-                INSERT INTO credit_transactions (user_id, amount, transaction_type, description)
-                VALUES (?, ?, ?, ?)
-            """, (user_id, SIGNUP_CREDITS, 'signup_bonus', 'Welcome bonus - 10 free credits'))
-        
-        conn.commit()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            password_hash = hash_password(password) if password else None
+        
+            if DATABASE_URL:
+                cursor.execute("""
+                    INSERT INTO users (email, password_hash, credits, email_verified)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id
+                """, (email.lower(), password_hash, SIGNUP_CREDITS, password is not None))
+                user_id = cursor.fetchone()[0]
+            else:
+                cursor.execute("""
+                    INSERT INTO users (email, password_hash, credits, email_verified)
+                    VALUES (?, ?, ?, ?)
+                """, (email.lower(), password_hash, SIGNUP_CREDITS, password is not None))
+                user_id = cursor.lastrowid
+        
+            # Record the signup bonus in transactions
+            if DATABASE_URL:
+                cursor.execute("""
+                    INSERT INTO credit_transactions (user_id, amount, transaction_type, description)
+                    VALUES (%s, %s, %s, %s)
+                """, (user_id, SIGNUP_CREDITS, 'signup_bonus', 'Welcome bonus - 10 free credits'))
+            else:
+                cursor.execute("""
+                    INSERT INTO credit_transactions (user_id, amount, transaction_type, description)
+                    VALUES (?, ?, ?, ?)
+                """, (user_id, SIGNUP_CREDITS, 'signup_bonus', 'Welcome bonus - 10 free credits'))
+        
+            conn.commit()
         return user_id
     except Exception as e:
         print(f"Error creating user: {e}")
@@ -346,16 +690,15 @@ def create_user(email, password=None):
 def get_user_by_email(email):
     """Get a user by email address"""
     try:
-        conn = get_db_connection()
-        cursor = dict_cursor(conn)
+        with db_connection() as conn:
+            cursor = dict_cursor(conn)
         
-        if DATABASE_URL:
-            cursor.execute("SELECT * FROM users WHERE email = %s", (email.lower(),))
-        else:
-            cursor.execute("SELECT * FROM users WHERE email = ?", (email.lower(),))
+            if DATABASE_URL:
+                cursor.execute("SELECT * FROM users WHERE email = %s", (email.lower(),))
+            else:
+                cursor.execute("SELECT * FROM users WHERE email = ?", (email.lower(),))
         
-        user = cursor.fetchone()
-        conn.close()
+            user = cursor.fetchone()
         
         if user:
             return dict(user) if hasattr(user, 'keys') else None
@@ -368,81 +711,64 @@ def get_user_by_email(email):
 def update_user_last_login(user_id):
     """Update user's last login timestamp"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        if DATABASE_URL:
-            cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s", (user_id,))
-        else:
-            cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?", (user_id,))
+            if DATABASE_URL:
+                cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s", (user_id,))
+            else:
+                cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?", (user_id,))
         
-        conn.commit()
-        conn.close()
+            conn.commit()
     except Exception as e:
         print(f"Error updating last login: {e}")
 
 
 def deduct_credits(user_id, amount, search_type, description=None):
-    """Deduct credits from a user's account"""
+    """
+    Deduct credits from a user's account.
+    Returns the remaining balance, or None if the user doesn't have enough credits.
+    """
+    desc = description or f'{search_type.capitalize()} search'
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if user has enough credits
-        if DATABASE_URL:
-            cursor.execute("SELECT credits FROM users WHERE id = %s", (user_id,))
-        else:
-            cursor.execute("SELECT credits FROM users WHERE id = ?", (user_id,))
-        
-        result = cursor.fetchone()
-        if not result or result[0] < amount:
-            conn.close()
-            return False
-        
-        # Deduct credits
-        if DATABASE_URL:
-            cursor.execute("UPDATE users SET credits = credits - %s WHERE id = %s", (amount, user_id))
-        else:
-            cursor.execute("UPDATE users SET credits = credits - ? WHERE id = ?", (amount, user_id))
-        
-        # Record transaction
-        desc = description or f'{search_type.capitalize()} search'
-        if DATABASE_URL:
-            cursor.execute("""
-                INSERT INTO credit_transactions (user_id, amount, transaction_type, search_type, description)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (user_id, -amount, 'search_used', search_type, desc))
-        else:
-            cursor.execute("""
-                INSERT INTO credit_transactions (user_id, amount, transaction_type, search_type, description)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, -amount, 'search_used', search_type, desc))
-        
-        conn.commit()
-        conn.close()
-        return True
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            # Check, debit and log in one statement so concurrent searches can't overdraw
+            if DATABASE_URL:
+                cursor.execute("""
+                    WITH debited AS (
+                        UPDATE users SET credits = credits - %s
+                        WHERE id = %s AND credits >= %s
+                        RETURNING id, credits
+                    ), logged AS (
+                        INSERT INTO credit_transactions (user_id, amount, transaction_type, search_type, description)
+                        SELECT id, %s, 'search_used', %s, %s FROM debited
+                    )
+                    SELECT credits FROM debited
+                """, (amount, user_id, amount, -amount, search_type, desc))
+                result = cursor.fetchone()
+            else:
+                # SQLite has no data-modifying CTEs, so the log insert is a second statement
+                cursor.execute("""
+                    UPDATE users SET credits = credits - ?
+                    WHERE id = ? AND credits >= ?
+                    RETURNING credits
+                """, (amount, user_id, amount))
+                result = cursor.fetchone()
+                if result:
+                    cursor.execute("""
+                        INSERT INTO credit_transactions (user_id, amount, transaction_type, search_type, description)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (user_id, -amount, 'search_used', search_type, desc))
+        
+            if not result:
+                return None
+            conn.commit()
+        return result[0]
     except Exception as e:
         print(f"Error deducting credits: {e}")
-        return False
-
-
-def get_user_credits(user_id):
-    """Get user's current credit balance"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if DATABASE_URL:
-            cursor.execute("SELECT credits FROM users WHERE id = %s", (user_id,))
-        else:
-            cursor.execute("SELECT credits FROM users WHERE id = ?", (user_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else 0
-    except Exception as e:
-        print(f"Error getting credits: {e}")
-        return 0
+        return None
 
 
 def create_magic_link(user_id):
@@ -451,22 +777,21 @@ def create_magic_link(user_id):
         token = generate_token()
         expires_at = datetime.now() + timedelta(minutes=15)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if DATABASE_URL:
-            cursor.execute("""
-                INSERT INTO magic_links (user_id, token, expires_at)
-                VALUES (%s, %s, %s)
-            """, (user_id, token, expires_at))
-        else:
-            cursor.execute("""
-                INSERT INTO magic_links (user_id, token, expires_at)
-                VALUES (?, ?, ?)
-            """, (user_id, token, expires_at))
-        
-        conn.commit()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            if DATABASE_URL:
+                cursor.execute("""
+                    INSERT INTO magic_links (user_id, token, expires_at)
+                    VALUES (%s, %s, %s)
+                """, (user_id, token, expires_at))
+            else:
+                cursor.execute("""
+                    INSERT INTO magic_links (user_id, token, expires_at)
+                    VALUES (?, ?, ?)
+                """, (user_id, token, expires_at))
+        
+            conn.commit()
         return token
     except Exception as e:
         print(f"Error creating magic link: {e}")
@@ -474,53 +799,57 @@ def create_magic_link(user_id):
 
 
 def verify_magic_link(token):
-    """Verify a magic link token and return user_id if valid"""
+    """Verify a magic link token and return user_id if valid (also records the login)"""
     try:
-        conn = get_db_connection()
-        cursor = dict_cursor(conn)
-        
-        if DATABASE_URL:
-            cursor.execute("""
-                SELECT user_id, expires_at, used_at FROM magic_links WHERE token = %s
-            """, (token,))
-        else:
-            cursor.execute("""
-                SELECT user_id, expires_at, used_at FROM magic_links WHERE token = ?
-            """, (token,))
-        
-        result = cursor.fetchone()
-        
-        if not result:
-            conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            now = datetime.now()
+        
+            # Consume the token only if it is unused and unexpired, so two clicks
+            # racing on the same link can't both log in
+            if DATABASE_URL:
+                cursor.execute("""
+                    WITH consumed AS (
+                        UPDATE magic_links SET used_at = CURRENT_TIMESTAMP
+                        WHERE token = %s AND used_at IS NULL AND expires_at > %s
+                        RETURNING user_id
+                    )
+                    UPDATE users SET email_verified = TRUE, last_login = CURRENT_TIMESTAMP
+                    FROM consumed
+                    WHERE users.id = consumed.user_id
+                    RETURNING users.id
+                """, (token, now))
+                result = cursor.fetchone()
+            else:
+                # SQLite has no data-modifying CTEs, so verify the user separately
+                cursor.execute("""
+                    UPDATE magic_links SET used_at = CURRENT_TIMESTAMP
+                    WHERE token = ? AND used_at IS NULL AND expires_at > ?
+                    RETURNING user_id
+                """, (token, now))
+                result = cursor.fetchone()
+                if result:
+                    cursor.execute(
+                        "UPDATE users SET email_verified = TRUE, last_login = CURRENT_TIMESTAMP WHERE id = ?",
+                        (result[0],)
+                    )
+        
+            if result:
+                conn.commit()
+                return result[0], None
+        
+            # Not consumed: look the token up only to explain why
+            if DATABASE_URL:
+                cursor.execute("SELECT used_at FROM magic_links WHERE token = %s", (token,))
+            else:
+                cursor.execute("SELECT used_at FROM magic_links WHERE token = ?", (token,))
+            link = cursor.fetchone()
+        
+        if not link:
             return None, "Invalid or expired link"
-        
-        result_dict = dict(result) if hasattr(result, 'keys') else {
-            'user_id': result[0], 'expires_at': result[1], 'used_at': result[2]
-        }
-        
-        if result_dict['used_at']:
-            conn.close()
+        if link[0]:
             return None, "This link has already been used"
-        
-        if result_dict['expires_at'] < datetime.now():
-            conn.close()
-            return None, "This link has expired. Please request a new one."
-        
-        # Mark as used
-        if DATABASE_URL:
-            cursor.execute("UPDATE magic_links SET used_at = CURRENT_TIMESTAMP WHERE token = %s", (token,))
-        else:
-            cursor.execute("UPDATE magic_links SET used_at = CURRENT_TIMESTAMP WHERE token = ?", (token,))
-        
-        # Mark user email as verified
-        if DATABASE_URL:
-            cursor.execute("UPDATE users SET email_verified = TRUE WHERE id = %s", (result_dict['user_id'],))
-        else:
-            cursor.execute("UPDATE users SET email_verified = TRUE WHERE id = ?", (result_dict['user_id'],))
-        
-        conn.commit()
-        conn.close()
-        return result_dict['user_id'], None
+        return None, "This link has expired. Please request a new one."
     except Exception as e:
         print(f"Error verifying magic link: {e}")
         return None, "An error occurred"
@@ -566,105 +895,112 @@ def send_magic_link_email(email, token):
 
 def record_payment(stripe_session_id, search_type, search_value, amount_pence, status='pending'):
     """Record a payment in the database"""
+    return record_payments_bulk([(stripe_session_id, search_type, search_value, amount_pence, status)])
+
+
+def record_payments_bulk(rows):
+    """
+    Record many payments in one statement.
+    rows: iterable of (stripe_session_id, search_type, search_value, amount_pence, status)
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement, so keep the last entry per session
+    rows = list({row[0]: row for row in rows}.values())
+    if not rows:
+        return True
+    
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if DATABASE_URL:
-            cursor.execute("""
-                INSERT INTO payments (stripe_session_id, search_type, search_value, amount_pence, status)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (stripe_session_id) DO UPDATE SET status = EXCLUDED.status
-            """, (stripe_session_id, search_type, search_value, amount_pence, status))
-        else:
-            cursor.execute("""
-                INSERT OR REPLACE INTO payments (stripe_session_id, search_type, search_value, amount_pence, status)
-                VALUES (?, ?, ?, ?, ?)
-            """, (stripe_session_id, search_type, search_value, amount_pence, status))
-        
-        conn.commit()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            if DATABASE_URL:
+                psycopg2.extras.execute_values(cursor, """
+                    INSERT INTO payments (stripe_session_id, search_type, search_value, amount_pence, status)
+                    VALUES %s
+                    ON CONFLICT (stripe_session_id) DO UPDATE SET status = EXCLUDED.status
+                """, rows, page_size=500)
+            else:
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO payments (stripe_session_id, search_type, search_value, amount_pence, status)
+                    VALUES (?, ?, ?, ?, ?)
+                """, rows)
+        
+            conn.commit()
         return True
     except Exception as e:
-        print(f"Error recording payment: {e}")
+        print(f"Error recording payments: {e}")
         return False
 
 
-def mark_payment_used(stripe_session_id):
-    """Mark a payment as used in the database"""
+def claim_payment(stripe_session_id, search_type, search_value, amount_pence):
+    """
+    Atomically record a checkout session as used.
+    Returns True if this call consumed it, False if it was already used,
+    or None if the database could not be reached.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if DATABASE_URL:
-            cursor.execute("""
-                UPDATE payments 
-                SET used_at = CURRENT_TIMESTAMP, status = 'used'
-                WHERE stripe_session_id = %s AND used_at IS NULL
-            """, (stripe_session_id,))
-        else:
-            cursor.execute("""
-                UPDATE payments 
-                SET used_at = CURRENT_TIMESTAMP, status = 'used'
-                WHERE stripe_session_id = ? AND used_at IS NULL
-            """, (stripe_session_id,))
-        
-        rows_affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            # Upsert so sessions never recorded as pending are still claimed exactly once
+            if DATABASE_URL:
+                cursor.execute("""
+                    INSERT INTO payments (stripe_session_id, search_type, search_value, amount_pence, status, used_at)
+                    VALUES (%s, %s, %s, %s, 'used', CURRENT_TIMESTAMP)
+                    ON CONFLICT (stripe_session_id) DO UPDATE
+                    SET used_at = CURRENT_TIMESTAMP, status = 'used'
+                    WHERE payments.used_at IS NULL
+                """, (stripe_session_id, search_type, search_value, amount_pence))
+            else:
+                cursor.execute("""
+                    INSERT INTO payments (stripe_session_id, search_type, search_value, amount_pence, status, used_at)
+                    VALUES (?, ?, ?, ?, 'used', CURRENT_TIMESTAMP)
+                    ON CONFLICT (stripe_session_id) DO UPDATE
+                    SET used_at = CURRENT_TIMESTAMP, status = 'used'
+                    WHERE payments.used_at IS NULL
+                """, (stripe_session_id, search_type, search_value, amount_pence))
+        
+            rows_affected = cursor.rowcount
+            conn.commit()
         return rows_affected > 0
     except Exception as e:
-        print(f"Error marking payment as used: {e}")
-        return False
+        print(f"Error claiming payment: {e}")
+        return None
 
 
-def is_payment_used(stripe_session_id):
-    """Check if a payment has already been used"""
-    # First check in-memory cache
-    if stripe_session_id in used_sessions:
-        return True
-    
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if DATABASE_URL:
-            cursor.execute("""
-                SELECT used_at FROM payments WHERE stripe_session_id = %s
-            """, (stripe_session_id,))
-        else:
-            cursor.execute("""
-                SELECT used_at FROM payments WHERE stripe_session_id = ?
-            """, (stripe_session_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            used_at = result[0] if isinstance(result, tuple) else result.get('used_at')
-            return used_at is not None
+def is_session_marked_used(stripe_session_id):
+    """Check the in-process record of consumed checkout sessions"""
+    with _used_sessions_lock:
+        if stripe_session_id in used_sessions:
+            used_sessions.move_to_end(stripe_session_id)
+            return True
         return False
-    except Exception as e:
-        print(f"Error checking payment status: {e}")
-        # Fall back to in-memory check
-        return stripe_session_id in used_sessions
 
 
-def search_properties_by_company(company_number):
-    """Search for properties owned by a company number"""
-    if not company_number:
-        return []
-    
-    # Normalize company number using single source of truth
+def mark_session_used(stripe_session_id):
+    """Remember a consumed checkout session, evicting the oldest past USED_SESSIONS_MAX"""
+    with _used_sessions_lock:
+        used_sessions[stripe_session_id] = True
+        used_sessions.move_to_end(stripe_session_id)
+        while len(used_sessions) > USED_SESSIONS_MAX:
+            used_sessions.popitem(last=False)
+
+
+def _page_clause(limit, offset):
+    """LIMIT/OFFSET suffix and params for a paginated search query ('' when unpaginated)"""
+    if limit is None:
+        return '', ()
+    placeholder = '%s' if DATABASE_URL else '?'
+    return f"LIMIT {placeholder} OFFSET {placeholder}", (limit, offset)
+
+
+def company_number_search_query(company_number, limit=None, offset=0):
+    """Build the (sql, params) for a company registration number search"""
     company_number_normalized = normalize_company_reg(company_number)
+    page_sql, page_params = _page_clause(limit, offset)
     
-    conn = get_db_connection()
-    cursor = dict_cursor(conn)
-    
-    # Query properties with matching company registration number using indexed normalized column
     if DATABASE_URL:
         # PostgreSQL: use normalized column with index
-        cursor.execute("""
+        return f"""
             SELECT 
                 p.id,
                 p.title_number,
@@ -688,11 +1024,45 @@ def search_properties_by_company(company_number):
             INNER JOIN proprietors pr ON p.id = pr.property_id
             WHERE pr.company_reg_normalized = %s
             ORDER BY p.property_address
-        """, (company_number_normalized,))
-    else:
-        # SQLite fallback: use function-based query (no normalized column in SQLite)
-        cursor.execute("""
-            SELECT
+            {page_sql}
+        """, (company_number_normalized, *page_params)
+    # SQLite fallback: normalized column is populated by scripts/load_data.py
+    return f"""
+        SELECT
+            p.id,
+            p.title_number,
+            p.tenure,
+            p.property_address,
+            p.district,
+            p.county,
+            p.region,
+            p.postcode,
+            p.price_paid,
+            p.date_proprietor_added,
+            pr.proprietor_name,
+            pr.proprietorship_category,
+            pr.address_line_1,
+            pr.address_line_2,
+            pr.address_line_3,
+            pr.company_registration_no,
+            'CCOD' as data_source,
+            NULL as country_incorporated
+        FROM properties p
+        INNER JOIN proprietors pr ON p.id = pr.property_id
+        WHERE pr.company_reg_normalized = ?
+        ORDER BY p.property_address
+        {page_sql}
+    """, (company_number_normalized, *page_params)
+
+
+def company_numbers_search_query(company_numbers):
+    """Build the (sql, params) for properties owned by any of several company numbers"""
+    company_list = sorted({normalize_company_reg(cn) for cn in company_numbers})
+    
+    if DATABASE_URL:
+        # PostgreSQL: one fixed statement for any list size; psycopg2 adapts the list to an array
+        return """
+            SELECT 
                 p.id,
                 p.title_number,
                 p.tenure,
@@ -709,54 +1079,323 @@ def search_properties_by_company(company_number):
                 pr.address_line_2,
                 pr.address_line_3,
                 pr.company_registration_no,
-                'CCOD' as data_source,
-                NULL as country_incorporated
+                COALESCE(p.data_source, 'CCOD') as data_source,
+                pr.country_incorporated
             FROM properties p
             INNER JOIN proprietors pr ON p.id = pr.property_id
-            WHERE UPPER(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(pr.company_registration_no), '(', ''), ')', ''), ' ', ''), '-', '')) = ?
-            ORDER BY p.property_address
-        """, (company_number_normalized,))
+            WHERE pr.company_reg_normalized = ANY(%s)
+            ORDER BY pr.proprietor_name, p.property_address
+            LIMIT 500
+        """, (company_list,)
+    # SQLite fallback: no array type, so expand one placeholder per number
+    return f"""
+        SELECT
+            p.id,
+            p.title_number,
+            p.tenure,
+            p.property_address,
+            p.district,
+            p.county,
+            p.region,
+            p.postcode,
+            p.price_paid,
+            p.date_proprietor_added,
+            pr.proprietor_name,
+            pr.proprietorship_category,
+            pr.address_line_1,
+            pr.address_line_2,
+            pr.address_line_3,
+            pr.company_registration_no,
+            'CCOD' as data_source,
+            NULL as country_incorporated
+        FROM properties p
+        INNER JOIN proprietors pr ON p.id = pr.property_id
+        WHERE pr.company_reg_normalized IN ({','.join(['?'] * len(company_list))})
+        ORDER BY pr.proprietor_name, p.property_address
+        LIMIT 500
+    """, company_list
+
+
+def iter_property_rows(sql, params, columns):
+    """
+    Yield tuples of the requested columns for a property search query without
+    materializing the full result. PostgreSQL uses a named (server-side) tuple
+    cursor that fetches EXPORT_ITERSIZE rows per round-trip, so no per-row dict is
+    built; the pooled connection is held until the generator is exhausted or closed.
+    """
+    with db_connection() as conn:
+        if DATABASE_URL:
+            cursor = conn.cursor(name='export_cursor')
+            cursor.itersize = EXPORT_ITERSIZE
+        else:
+            cursor = conn.cursor()
+        cursor.execute(sql, params)
+        try:
+            # Named cursors only have a description once the first batch is fetched
+            first_batch = cursor.fetchmany(EXPORT_ITERSIZE)
+            positions = [column[0] for column in cursor.description]
+            row_values = operator.itemgetter(*(positions.index(name) for name in columns))
+            for row in first_batch:
+                yield row_values(row)
+            for row in cursor:
+                yield row_values(row)
+        finally:
+            cursor.close()
+
+
+def copy_property_csv(sql, params, columns):
+    """
+    PostgreSQL only: run a property search as COPY (...) TO STDOUT WITH CSV so the
+    CSV is formatted by the server and no Python row objects are built. Output is
+    spooled in memory (up to EXPORT_COPY_SPOOL_SIZE, then to a temp file) and the
+    connection goes back to the pool before the response is streamed. Returns the
+    rewound spool, or None when the search matched nothing.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_COPY_SPOOL_SIZE)
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            copy_sql = cursor.mogrify(
+                f"COPY (SELECT {', '.join(columns)} FROM ({sql}) AS results) TO STDOUT WITH CSV",
+                params
+            )
+            cursor.copy_expert(copy_sql, spool)
+    if spool.tell() == 0:
+        spool.close()
+        return None
+    spool.seek(0)
+    return spool
+
+
+def _iter_spool(spool):
+    """Yield a spooled export in EXPORT_COPY_CHUNK_SIZE pieces, closing it afterwards"""
+    with spool:
+        yield from iter(lambda: spool.read(EXPORT_COPY_CHUNK_SIZE), b'')
+
+
+def cached_search(search_type, search_value, search_fn, **kwargs):
+    """
+    Return search_fn(search_value, **kwargs), reusing the result for SEARCH_CACHE_TTL seconds.
+    Name, number and address searches are case-insensitive, so the key is lowercased.
+    """
+    key = _search_cache_key(search_type, search_value, kwargs)
+    result = _search_cache.get(key)
+    if result is None:
+        result = search_fn(search_value, **kwargs)
+        _search_cache.set(key, result, SEARCH_CACHE_TTL)
+    return result
+
+
+def _search_cache_key(search_type, search_value, kwargs):
+    return (search_type, search_value.lower(), tuple(sorted(kwargs.items())))
+
+
+def cached_property_results(search_type, search_value):
+    """
+    The unpaginated property rows a recent /api/search left in the cache for this
+    search, or None on a miss, so exports don't re-run the query the user just saw
+    """
+    cache_type = property_search_type(search_type)
+    result = _search_cache.get(_search_cache_key(cache_type, search_value, {'limit': None, 'offset': 0}))
+    if result is not None and cache_type == 'name':
+        result = result[0]  # name searches cache (results, suggestions)
+    return result
+
+
+def _paid_search_key(search_type, search_value):
+    return f'{search_type}:{search_value.lower()}'
+
+
+def remember_paid_search(search_type, search_value):
+    """Record in the session that this search has been paid for, for PAID_SEARCH_TTL seconds"""
+    now = time.time()
+    paid = {key: expires for key, expires in session.get('paid_searches', {}).items() if expires > now}
+    paid[_paid_search_key(search_type, search_value)] = now + PAID_SEARCH_TTL
+    session['paid_searches'] = dict(sorted(paid.items(), key=operator.itemgetter(1))[-PAID_SEARCHES_MAX:])
+
+
+def search_already_paid(search_type, search_value):
+    """Whether this session paid for the search within the last PAID_SEARCH_TTL seconds"""
+    expires = session.get('paid_searches', {}).get(_paid_search_key(search_type, search_value))
+    return expires is not None and expires > time.time()
+
+
+def search_pagination(page, page_size, results, query_builder, search_value):
+    """
+    Pagination fields for a paged /api/search response ({} when unpaginated).
+    The total is only counted on page 1, and skipped when that page isn't full.
+    """
+    if not page:
+        return {}
     
-    results = cursor.fetchall()
-    conn.close()
+    pagination = {'page': page, 'page_size': page_size}
+    if page == 1:
+        if len(results) < page_size:
+            pagination['total'] = len(results)
+        else:
+            pagination['total'] = count_search_rows(*query_builder(search_value))
+    return pagination
+
+
+def search_properties_by_company(company_number, limit=None, offset=0):
+    """Search for properties owned by a company number"""
+    if not company_number:
+        return []
     
-    return [dict(row) for row in results]
+    with db_connection() as conn:
+        cursor = dict_cursor(conn)
+        # Query properties with matching company registration number using indexed normalized column
+        cursor.execute(*company_number_search_query(company_number, limit, offset))
+        results = cursor.fetchall()
+    
+    return results
 
 
-def get_all_unique_company_names():
-    """Get all unique company names from the database"""
-    conn = get_db_connection()
-    cursor = dict_cursor(conn)
-    cursor.execute("""
-        SELECT DISTINCT proprietor_name 
-        FROM proprietors 
-        WHERE proprietor_name IS NOT NULL AND TRIM(proprietor_name) != ''
-        ORDER BY proprietor_name
-    """)
-    if DATABASE_URL:
+def search_properties_by_company_numbers(company_numbers):
+    """Search for properties owned by any of the given company numbers"""
+    if not company_numbers:
+        return []
+    
+    with db_connection() as conn:
+        cursor = dict_cursor(conn)
+        cursor.execute(*company_numbers_search_query(company_numbers))
+        results = cursor.fetchall()
+    
+    return results
+
+
+def _fetch_unique_company_names():
+    """Load all unique company names from the database, one spelling per case-insensitive name"""
+    with db_connection() as conn:
+        cursor = dict_cursor(conn)
+        cursor.execute("""
+            SELECT MIN(proprietor_name) AS proprietor_name
+            FROM proprietors 
+            WHERE proprietor_name IS NOT NULL AND TRIM(proprietor_name) != ''
+            GROUP BY UPPER(proprietor_name)
+            ORDER BY proprietor_name
+        """)
         names = [row['proprietor_name'] for row in cursor.fetchall()]
-    else:
-        names = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return names
 
 
-def search_properties_by_company_name(company_name, fuzzy_threshold=70):
-    """Search for properties owned by a company name (partial match with fuzzy suggestions)"""
-    if not company_name:
-        return [], []
+def company_names_snapshot():
+    """The current CompanyNamesSnapshot, reloaded first if its TTL has expired"""
+    if time.time() < _company_names_cache['expires']:
+        return _company_names_cache['snapshot']
     
-    # Normalize company name using helper function
-    company_name_normalized = normalize_text_upper(company_name)
-    company_name_original = company_name.strip()
+    with _company_names_lock:
+        # Another thread may have refreshed the cache while we waited
+        if time.time() < _company_names_cache['expires']:
+            return _company_names_cache['snapshot']
+        
+        names = tuple(_fetch_unique_company_names())
+        # Pre-processed once here so fuzzy matching can skip it per query
+        processed = tuple(fuzz_utils.default_process(n) for n in names)
+        # Sorted copy of the processed names for bisect prefix lookups
+        prefix_order = sorted(range(len(processed)), key=processed.__getitem__)
+        snapshot = CompanyNamesSnapshot(
+            names, processed, tuple(processed[i] for i in prefix_order), tuple(prefix_order)
+        )
+        _company_names_cache['snapshot'] = snapshot
+        _company_names_cache['expires'] = time.time() + COMPANY_NAMES_CACHE_TTL
+        return snapshot
+
+
+def get_all_unique_company_names():
+    """
+    Get all unique company names, cached in-process for COMPANY_NAMES_CACHE_TTL seconds.
+    The data only changes on the monthly refresh, so re-running SELECT DISTINCT
+    over the whole proprietors table on every fuzzy lookup is wasted work.
+    """
+    return company_names_snapshot().names
+
+
+def invalidate_search_caches():
+    """Drop cached company names and search results, e.g. after a data reload"""
+    with _company_names_lock:
+        _company_names_cache['expires'] = 0
+    _search_cache.clear()
+
+
+def _prefix_company_name_indexes(snapshot, processed_query, limit):
+    """Indexes of the snapshot's names whose processed form starts with processed_query"""
+    keys = snapshot.prefix_keys
+    indexes = snapshot.prefix_indexes
     
-    conn = get_db_connection()
-    cursor = dict_cursor(conn)
+    matches = []
+    position = bisect.bisect_left(keys, processed_query)
+    while position < len(keys) and len(matches) < limit and keys[position].startswith(processed_query):
+        matches.append(indexes[position])
+        position += 1
+    return matches
+
+
+def _trigram_name_candidates(query, limit):
+    """Case-insensitively distinct proprietor names closest to query by pg_trgm word similarity (GIN-indexed)"""
+    query_upper = normalize_text_upper(query)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT MIN(proprietor_name)
+            FROM proprietors
+            WHERE %s <%% proprietor_name_upper
+            GROUP BY proprietor_name_upper
+            ORDER BY MAX(word_similarity(%s, proprietor_name_upper)) DESC
+            LIMIT %s
+        """, (query_upper, query_upper, limit))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def suggest_company_names(query, min_score, limit=5):
+    """
+    Match a query against company names for "did you mean" suggestions.
+    Returns a list of (name, score) tuples with score >= min_score, best first.
+    """
+    processed_query = fuzz_utils.default_process(query)
+    if not processed_query:
+        return []
+    
+    if DATABASE_URL:
+        # PostgreSQL: let the trigram index pick a short candidate list instead of
+        # pulling every distinct name into the process, then re-rank with WRatio
+        names = _trigram_name_candidates(query, TRIGRAM_CANDIDATE_LIMIT)
+        choices = [fuzz_utils.default_process(name) for name in names]
+    else:
+        snapshot = company_names_snapshot()
+        names = snapshot.names
+        choices = snapshot.processed
+        
+        # Truncated names ("tesco stor") are served by a prefix lookup;
+        # only fall back to the full fuzzy scan when no prefix match qualifies
+        prefix_matches = []
+        for index in _prefix_company_name_indexes(snapshot, processed_query, limit):
+            score = fuzz.WRatio(processed_query, choices[index], processor=None)
+            if score >= min_score:
+                prefix_matches.append((names[index], score))
+        if prefix_matches:
+            return sorted(prefix_matches, key=lambda match: match[1], reverse=True)
+    
+    # Choices are already processed, so only the query needs default_process.
+    # score_cutoff lets RapidFuzz skip pairs that can't reach min_score.
+    matches = process.extract(
+        processed_query,
+        choices,
+        scorer=fuzz.WRatio,
+        processor=None,
+        limit=limit,
+        score_cutoff=min_score
+    )
+    return [(names[index], score) for _, score, index in matches]
+
+
+def company_name_search_query(company_name, limit=None, offset=0):
+    """Build the (sql, params) for a partial company name search"""
+    company_name_normalized = normalize_text_upper(company_name)
+    page_sql, page_params = _page_clause(limit, offset)
     
-    # First, try exact/partial match using indexed normalized column
     if DATABASE_URL:
         # PostgreSQL: use trigram-indexed normalized column
-        cursor.execute("""
+        return f"""
             SELECT 
                 p.id,
                 p.title_number,
@@ -780,83 +1419,83 @@ def search_properties_by_company_name(company_name, fuzzy_threshold=70):
             INNER JOIN proprietors pr ON p.id = pr.property_id
             WHERE pr.proprietor_name_upper LIKE %s
             ORDER BY pr.proprietor_name, p.property_address
-        """, (f'%{company_name_normalized}%',))
-    else:
-        # SQLite fallback: use function-based query
-        cursor.execute("""
-            SELECT
-                p.id,
-                p.title_number,
-                p.tenure,
-                p.property_address,
-                p.district,
-                p.county,
-                p.region,
-                p.postcode,
-                p.price_paid,
-                p.date_proprietor_added,
-                pr.proprietor_name,
-                pr.proprietorship_category,
-                pr.address_line_1,
-                pr.address_line_2,
-                pr.address_line_3,
-                pr.company_registration_no,
-                'CCOD' as data_source,
-                NULL as country_incorporated
-            FROM properties p
-            INNER JOIN proprietors pr ON p.id = pr.property_id
-            WHERE UPPER(TRIM(pr.proprietor_name)) LIKE ?
-            ORDER BY pr.proprietor_name, p.property_address
-        """, (f'%{company_name_normalized}%',))
+            {page_sql}
+        """, (f'%{company_name_normalized}%', *page_params)
+    # SQLite fallback: use function-based query
+    return f"""
+        SELECT
+            p.id,
+            p.title_number,
+            p.tenure,
+            p.property_address,
+            p.district,
+            p.county,
+            p.region,
+            p.postcode,
+            p.price_paid,
+            p.date_proprietor_added,
+            pr.proprietor_name,
+            pr.proprietorship_category,
+            pr.address_line_1,
+            pr.address_line_2,
+            pr.address_line_3,
+            pr.company_registration_no,
+            'CCOD' as data_source,
+            NULL as country_incorporated
+        FROM properties p
+        INNER JOIN proprietors pr ON p.id = pr.property_id
+        WHERE UPPER(TRIM(pr.proprietor_name)) LIKE ?
+        ORDER BY pr.proprietor_name, p.property_address
+        {page_sql}
+    """, (f'%{company_name_normalized}%', *page_params)
+
+
+def search_properties_by_company_name(company_name, fuzzy_threshold=70, limit=None, offset=0):
+    """Search for properties owned by a company name (partial match with fuzzy suggestions)"""
+    if not company_name:
+        return [], []
+    
+    company_name_original = company_name.strip()
     
-    results = cursor.fetchall()
-    conn.close()
+    with db_connection() as conn:
+        cursor = dict_cursor(conn)
+        # First, try exact/partial match using indexed normalized column
+        cursor.execute(*company_name_search_query(company_name, limit, offset))
+        results = cursor.fetchall()
     
-    # If we have results, return them with no suggestions
-    if results:
-        return [dict(row) for row in results], []
+    # If we have results (or are past the first page), return them with no suggestions
+    if results or offset:
+        return results, []
     
     # If no results, perform fuzzy matching to find suggestions
-    all_company_names = get_all_unique_company_names()
-    
-    # Use rapidfuzz to find similar company names
     # We'll use WRatio which combines multiple algorithms for better results
-    matches = process.extract(
-        company_name_original,
-        all_company_names,
-        scorer=fuzz.WRatio,
-        limit=5
-    )
+    matches = suggest_company_names(company_name_original, fuzzy_threshold)
     
-    # Filter matches above threshold and return unique suggestions
-    suggestions = []
-    seen_names = set()
-    for match_name, score, _ in matches:
-        if score >= fuzzy_threshold and match_name.upper() not in seen_names:
-            suggestions.append({
-                'name': match_name,
-                'similarity': round(score, 1)
-            })
-            seen_names.add(match_name.upper())
+    # Candidate names are already unique ignoring case
+    suggestions = [
+        {'name': match_name, 'similarity': round(score, 1)}
+        for match_name, score in matches
+    ]
     
     return [], suggestions
 
 
-def search_properties_by_address(address_query):
-    """Search for properties by address (partial match on property_address or postcode)"""
-    if not address_query:
-        return []
-    
-    # Normalize address using helper function
+def address_search_query(address_query, limit=None, offset=0):
+    """Build the (sql, params) for a partial address or postcode search (capped at ADDRESS_RESULT_CAP rows)"""
     address_normalized = normalize_text_upper(address_query)
+    # Pages are taken from within the capped result, never beyond it
+    limit = ADDRESS_RESULT_CAP if limit is None else min(limit, max(ADDRESS_RESULT_CAP - offset, 0))
+    page_sql, page_params = _page_clause(limit, offset)
     
-    conn = get_db_connection()
-    cursor = dict_cursor(conn)
-    
-    # Search in property_address and postcode fields using indexed normalized columns
     if DATABASE_URL:
-        # PostgreSQL: use trigram-indexed normalized columns
-        cursor.execute("""
+        # PostgreSQL: one branch per indexed column so each gets its own index
+        # scan instead of an OR'd bitmap; each branch keeps its first
+        # ADDRESS_RESULT_CAP rows by address, so the union matches the single query.
+        # Postcodes are matched by prefix (btree text_pattern_ops); the address
+        # text includes the postcode, so mid-postcode fragments still match there.
+        # The address trigram index covers only the first 200 characters, so the
+        # predicate has to use the same LEFT() expression
+        select_columns = """
             SELECT 
                 p.id,
                 p.title_number,
@@ -875,61 +1514,106 @@ def search_properties_by_address(address_query):
                 pr.address_line_3,
                 pr.company_registration_no,
                 COALESCE(p.data_source, 'CCOD') as data_source,
-                pr.country_incorporated
-            FROM properties p
-            INNER JOIN proprietors pr ON p.id = pr.property_id
-            WHERE p.property_address_upper LIKE %s
-               OR p.postcode_upper LIKE %s
-            ORDER BY p.property_address
-            LIMIT 500
-        """, (f'%{address_normalized}%', f'%{address_normalized}%'))
-    else:
-        # SQLite fallback: use function-based query
-        cursor.execute("""
-            SELECT
-                p.id,
-                p.title_number,
-                p.tenure,
-                p.property_address,
-                p.district,
-                p.county,
-                p.region,
-                p.postcode,
-                p.price_paid,
-                p.date_proprietor_added,
-                pr.proprietor_name,
-                pr.proprietorship_category,
-                pr.address_line_1,
-                pr.address_line_2,
-                pr.address_line_3,
-                pr.company_registration_no,
-                'CCOD' as data_source,
-                NULL as country_incorporated
+                pr.country_incorporated
             FROM properties p
             INNER JOIN proprietors pr ON p.id = pr.property_id
-            WHERE UPPER(TRIM(p.property_address)) LIKE ?
-               OR UPPER(TRIM(p.postcode)) LIKE ?
-            ORDER BY p.property_address
-            LIMIT 500
-        """, (f'%{address_normalized}%', f'%{address_normalized}%'))
+        """
+        if is_outward_code(address_normalized):
+            # A bare outward code only means a postcode district: prefix lookup alone
+            return f"""
+                {select_columns}
+                WHERE p.postcode_upper LIKE %s
+                ORDER BY p.property_address
+                {page_sql}
+            """, (f'{address_normalized}%', *page_params)
+        return f"""
+            ({select_columns}
+             WHERE LEFT(p.property_address_upper, 200) LIKE %s
+             ORDER BY p.property_address
+             LIMIT {ADDRESS_RESULT_CAP})
+            UNION
+            ({select_columns}
+             WHERE p.postcode_upper LIKE %s
+             ORDER BY p.property_address
+             LIMIT {ADDRESS_RESULT_CAP})
+            ORDER BY property_address
+            {page_sql}
+        """, (f'%{address_normalized}%', f'{address_normalized}%', *page_params)
+    # SQLite fallback: use function-based query
+    if is_outward_code(address_normalized):
+        where_sql = "UPPER(TRIM(p.postcode)) LIKE ?"
+        where_params = (f'{address_normalized}%',)
+    else:
+        where_sql = "UPPER(TRIM(p.property_address)) LIKE ? OR UPPER(TRIM(p.postcode)) LIKE ?"
+        where_params = (f'%{address_normalized}%', f'%{address_normalized}%')
+    return f"""
+        SELECT
+            p.id,
+            p.title_number,
+            p.tenure,
+            p.property_address,
+            p.district,
+            p.county,
+            p.region,
+            p.postcode,
+            p.price_paid,
+            p.date_proprietor_added,
+            pr.proprietor_name,
+            pr.proprietorship_category,
+            pr.address_line_1,
+            pr.address_line_2,
+            pr.address_line_3,
+            pr.company_registration_no,
+            'CCOD' as data_source,
+            NULL as country_incorporated
+        FROM properties p
+        INNER JOIN proprietors pr ON p.id = pr.property_id
+        WHERE {where_sql}
+        ORDER BY p.property_address
+        {page_sql}
+    """, (*where_params, *page_params)
+
+
+def search_properties_by_address(address_query, limit=None, offset=0):
+    """Search for properties by address (partial match on property_address or postcode)"""
+    if not address_query:
+        return []
     
-    results = cursor.fetchall()
-    conn.close()
+    with db_connection() as conn:
+        cursor = dict_cursor(conn)
+        # Search in property_address and postcode fields using indexed normalized columns
+        cursor.execute(*address_search_query(address_query, limit, offset))
+        results = cursor.fetchall()
     
-    return [dict(row) for row in results]
+    return results
+
+
+def count_search_rows(sql, params):
+    """Count the rows an unpaginated (sql, params) search query would return"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM ({sql}) AS matches", params)
+        return cursor.fetchone()[0]
+
+
+# Words marking an officer name as a company rather than an individual, compiled
+# once into a single alternation. Indicators must stand alone as words, so names
+# like "VINCENT" or "LINCOLN" aren't mistaken for "INC".
+CORPORATE_OFFICER_INDICATORS = [
+    'LTD', 'LIMITED', 'LLP', 'PLC', 'INC', 'INCORPORATED',
+    'CORP', 'CORPORATION', 'LLC', 'CO.', '& CO', 'PARTNERS',
+    'TRUSTEES', 'TRUST', 'SECRETARIAL', 'SERVICES', 'NOMINEES'
+]
+_corporate_officer_re = re.compile(
+    r'(?<!\w)(?:' + '|'.join(re.escape(indicator) for indicator in CORPORATE_OFFICER_INDICATORS) + r')(?!\w)'
+)
 
 
 def is_corporate_officer(name):
     """Check if an officer name appears to be a corporate entity rather than an individual."""
     if not name:
         return False
-    name_upper = name.upper()
-    corporate_indicators = [
-        'LTD', 'LIMITED', 'LLP', 'PLC', 'INC', 'INCORPORATED',
-        'CORP', 'CORPORATION', 'LLC', 'CO.', '& CO', 'PARTNERS',
-        'TRUSTEES', 'TRUST', 'SECRETARIAL', 'SERVICES', 'NOMINEES'
-    ]
-    return any(indicator in name_upper for indicator in corporate_indicators)
+    return _corporate_officer_re.search(name.upper()) is not None
 
 
 def search_directors_from_companies_house(director_name, items_per_page=50):
@@ -943,6 +1627,11 @@ def search_directors_from_companies_house(director_name, items_per_page=50):
     if not COMPANIES_HOUSE_API_KEY:
         return [], "Companies House API key not configured. Please set COMPANIES_HOUSE_API_KEY environment variable."
     
+    cache_key = ('officers', director_name.strip().lower(), items_per_page)
+    cached_officers = _companies_house_cache.get(cache_key)
+    if cached_officers is not None:
+        return cached_officers, None
+    
     try:
         # Search officers endpoint - request more results to filter individuals
         url = f"{COMPANIES_HOUSE_BASE_URL}/search/officers"
@@ -951,18 +1640,12 @@ def search_directors_from_companies_house(director_name, items_per_page=50):
             'items_per_page': items_per_page
         }
         
-        # Companies House API uses Basic Auth with API key as username, no password
-        response = requests.get(
-            url,
-            params=params,
-            auth=(COMPANIES_HOUSE_API_KEY, ''),
-            timeout=15
-        )
+        response = companies_house_get(url, params=params)
         
-        if response.status_code == 401:
-            return [], "Invalid API key - please check COMPANIES_HOUSE_API_KEY is set correctly"
-        elif response.status_code == 429:
+        if response is None or response.status_code == 429:
             return [], "Rate limit exceeded. Please try again later."
+        elif response.status_code == 401:
+            return [], "Invalid API key - please check COMPANIES_HOUSE_API_KEY is set correctly"
         elif response.status_code == 400:
             # Log the actual error from Companies House
             try:
@@ -1001,6 +1684,7 @@ def search_directors_from_companies_house(director_name, items_per_page=50):
             
             officers.append(officer_info)
         
+        _companies_house_cache.set(cache_key, officers, COMPANIES_HOUSE_CACHE_TTL)
         return officers, None
         
     except requests.exceptions.Timeout:
@@ -1011,6 +1695,17 @@ def search_directors_from_companies_house(director_name, items_per_page=50):
         return [], f"Error: {str(e)}"
 
 
+def companies_house_get(url, **kwargs):
+    """
+    GET a Companies House URL on the shared session, or return None without calling
+    out when this instance has used up its share of the API key's rate limit
+    """
+    if take_rate_limit_token(('companies_house',), CH_RATE_LIMIT_REQUESTS, CH_RATE_LIMIT_REQUESTS / CH_RATE_LIMIT_WINDOW):
+        return None
+    # Companies House API uses Basic Auth with API key as username, no password
+    return _ch_session.get(url, auth=(COMPANIES_HOUSE_API_KEY, ''), timeout=15, **kwargs)
+
+
 def get_officer_appointments(officer_link):
     """
     Get all company appointments for a specific officer.
@@ -1021,18 +1716,19 @@ def get_officer_appointments(officer_link):
     if not officer_link or not COMPANIES_HOUSE_API_KEY:
         return []
     
+    cache_key = ('appointments', officer_link)
+    cached_appointments = _companies_house_cache.get(cache_key)
+    if cached_appointments is not None:
+        return cached_appointments
+    
     try:
         # The links.self from search already points to /officers/{id}/appointments
         # So we use it directly without appending /appointments again
         url = f"{COMPANIES_HOUSE_BASE_URL}{officer_link}"
         
-        response = requests.get(
-            url,
-            auth=(COMPANIES_HOUSE_API_KEY, ''),
-            timeout=15
-        )
+        response = companies_house_get(url)
         
-        if response.status_code != 200:
+        if response is None or response.status_code != 200:
             return []
         
         data = response.json()
@@ -1050,6 +1746,7 @@ def get_officer_appointments(officer_link):
             if appointment['company_number']:
                 appointments.append(appointment)
         
+        _companies_house_cache.set(cache_key, appointments, COMPANIES_HOUSE_CACHE_TTL)
         return appointments
         
     except Exception:
@@ -1079,14 +1776,8 @@ def search_properties_by_director(director_name):
     
     if not officers:
         # No individual officers found - suggest trying company name search instead
-        all_company_names = get_all_unique_company_names()
-        matches = process.extract(
-            director_name,
-            all_company_names,
-            scorer=fuzz.WRatio,
-            limit=5
-        )
-        suggestions = [{'name': m[0], 'similarity': round(m[1], 1)} for m in matches if m[1] >= 60]
+        matches = suggest_company_names(director_name, 60)
+        suggestions = [{'name': name, 'similarity': round(score, 1)} for name, score in matches]
         return [], [], suggestions, "No individual directors found matching this name. Try searching by company name instead."
     
     # Step 2: For each officer, get their company appointments (PARALLELIZED)
@@ -1096,122 +1787,59 @@ def search_properties_by_director(director_name):
     # Limit to first 15 individual officers to balance thoroughness with rate limits
     officers_to_process = officers[:15]
     
-    # Parallelize API calls using ThreadPoolExecutor for faster execution
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Submit all appointment fetch tasks
-        future_to_officer = {
-            executor.submit(get_officer_appointments, officer.get('links', {}).get('self', '')): officer
-            for officer in officers_to_process
-            if officer.get('links', {}).get('self', '')
-        }
-        
-        # Process completed futures as they finish
-        for future in as_completed(future_to_officer):
-            officer = future_to_officer[future]
-            try:
-                appointments = future.result()
+    officer_links = [officer.get('links', {}).get('self', '') for officer in officers_to_process]
+    
+    # Fetch all appointment lists concurrently; map() keeps results in officer order
+    # so directors_found is deterministic (get_officer_appointments never raises)
+    with ThreadPoolExecutor(max_workers=CH_MAX_WORKERS) as executor:
+        appointment_lists = list(executor.map(get_officer_appointments, officer_links))
+    
+    for officer, appointments in zip(officers_to_process, appointment_lists):
+        # Collect unique company numbers
+        for appt in appointments:
+            company_num = appt.get('company_number', '').strip()
+            if company_num:
+                all_company_numbers.add(company_num)
                 
-                # Collect unique company numbers
-                for appt in appointments:
-                    company_num = appt.get('company_number', '').strip()
-                    if company_num:
-                        all_company_numbers.add(company_num)
-                        
-                        # Track which directors map to which companies
-                        directors_found.append({
-                            'director_name': officer.get('name', ''),
-                            'company_number': company_num,
-                            'company_name': appt.get('company_name', ''),
-                            'officer_role': appt.get('officer_role', ''),
-                            'appointed_on': appt.get('appointed_on', ''),
-                            'resigned_on': appt.get('resigned_on', ''),
-                            'company_status': appt.get('company_status', '')
-                        })
-            except Exception as e:
-                # Log error but continue processing other officers
-                print(f"Error fetching appointments for officer {officer.get('name', 'unknown')}: {e}")
+                # Track which directors map to which companies
+                directors_found.append({
+                    'director_name': officer.get('name', ''),
+                    'company_number': company_num,
+                    'company_name': appt.get('company_name', ''),
+                    'officer_role': appt.get('officer_role', ''),
+                    'appointed_on': appt.get('appointed_on', ''),
+                    'resigned_on': appt.get('resigned_on', ''),
+                    'company_status': appt.get('company_status', '')
+                })
     
     if not all_company_numbers:
         # Found directors but no company appointments
         return [], directors_found, [], f"Found {len(officers)} matching directors but none have company appointments in the registry."
     
     # Step 3: Search our local database for properties owned by these companies
-    conn = get_db_connection()
-    cursor = dict_cursor(conn)
-    
-    # Build query with multiple company numbers using normalized column
-    placeholders = ','.join(['%s'] * len(all_company_numbers))
-    company_list = [normalize_company_reg(cn) for cn in all_company_numbers]
-    
-    if DATABASE_URL:
-        # PostgreSQL: use indexed normalized column
-        cursor.execute(f"""
-            SELECT 
-                p.id,
-                p.title_number,
-                p.tenure,
-                p.property_address,
-                p.district,
-                p.county,
-                p.region,
-                p.postcode,
-                p.price_paid,
-                p.date_proprietor_added,
-                pr.proprietor_name,
-                pr.proprietorship_category,
-                pr.address_line_1,
-                pr.address_line_2,
-                pr.address_line_3,
-                pr.company_registration_no,
-                COALESCE(p.data_source, 'CCOD') as data_source,
-                pr.country_incorporated
-            FROM properties p
-            INNER JOIN proprietors pr ON p.id = pr.property_id
-            WHERE pr.company_reg_normalized IN ({placeholders})
-            ORDER BY pr.proprietor_name, p.property_address
-            LIMIT 500
-        """, company_list)
-    else:
-        # SQLite fallback: use function-based query
-        cursor.execute(f"""
-            SELECT
-                p.id,
-                p.title_number,
-                p.tenure,
-                p.property_address,
-                p.district,
-                p.county,
-                p.region,
-                p.postcode,
-                p.price_paid,
-                p.date_proprietor_added,
-                pr.proprietor_name,
-                pr.proprietorship_category,
-                pr.address_line_1,
-                pr.address_line_2,
-                pr.address_line_3,
-                pr.company_registration_no,
-                'CCOD' as data_source,
-                NULL as country_incorporated
-            FROM properties p
-            INNER JOIN proprietors pr ON p.id = pr.property_id
-            WHERE UPPER(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(pr.company_registration_no), '(', ''), ')', ''), ' ', ''), '-', ''))
-                  IN ({','.join(['?'] * len(company_list))})
-            ORDER BY pr.proprietor_name, p.property_address
-            LIMIT 500
-        """, company_list)
-    
-    results = cursor.fetchall()
-    conn.close()
+    results = search_properties_by_company_numbers(all_company_numbers)
     
-    return [dict(row) for row in results], directors_found, [], None
+    return results, directors_found, [], None
+
+
+# Anonymous renders of the public pages are identical for everyone, so the CDN may
+# serve them; pages rendered for a signed-in user carry their credits and must not be shared
+PUBLIC_PAGE_CACHE_CONTROL = 'public, max-age=300, s-maxage=3600'
+
+
+def page_response(template, user=None, **context):
+    """Render a page template with Cache-Control set for anonymous or signed-in visitors"""
+    response = app.make_response(render_template(template, user=user, **context))
+    response.headers['Cache-Control'] = 'private, no-store' if user else PUBLIC_PAGE_CACHE_CONTROL
+    response.vary.add('Cookie')
+    return response
 
 
 @app.route('/')
 def landing():
     """Landing page"""
     user = get_current_user()
-    return render_template('landing.html', user=user)
+    return page_response('landing.html', user)
 
 
 @app.route('/robots.txt')
@@ -1294,7 +1922,7 @@ def blog_detail(slug):
 def search():
     """Search page"""
     user = get_current_user()
-    return render_template('search.html', user=user)
+    return page_response('search.html', user)
 
 
 @app.route('/auth')
@@ -1303,7 +1931,7 @@ def auth_page():
     # Redirect if already logged in
     if get_current_user():
         return redirect(url_for('search'))
-    return render_template('auth.html')
+    return page_response('auth.html')
 
 
 @app.route('/faq')
@@ -1339,10 +1967,9 @@ def verify_magic_link_route():
     if error:
         return render_template('auth.html', error=error)
     
-    # Log the user in
+    # Log the user in (verify_magic_link already stamped last_login)
     session.permanent = True
     session['user_id'] = user_id
-    update_user_last_login(user_id)
     
     return redirect(url_for('search'))
 
@@ -1359,7 +1986,7 @@ def api_register():
         return jsonify({'success': False, 'error': 'Email is required'}), 400
     
     # Basic email validation
-    if '@' not in email or '.' not in email:
+    if not is_valid_email(email):
         return jsonify({'success': False, 'error': 'Please enter a valid email address'}), 400
     
     # Check if user already exists
@@ -1421,25 +2048,29 @@ def api_login():
     
     if not email:
         return jsonify({'success': False, 'error': 'Email is required'}), 400
+    if not password:
+        return jsonify({'success': False, 'error': 'Password is required'}), 400
     
     user = get_user_by_email(email)
     
+    # Every path below pays for one bcrypt check, so response time doesn't
+    # separate unknown emails from real accounts. Passwordless accounts still
+    # get their own message, so the sign-in form can offer a magic link.
     if not user:
-        return jsonify({'success': False, 'error': 'No account found with this email'}), 400
+        verify_password(password, DUMMY_PASSWORD_HASH)
+        return jsonify({'success': False, 'error': 'Incorrect email or password'}), 400
     
     if not user.get('password_hash'):
         # User registered with magic link only
+        verify_password(password, DUMMY_PASSWORD_HASH)
         return jsonify({
             'success': False, 
             'error': 'This account uses passwordless login. Click "Send Magic Link" to sign in.',
             'needs_magic_link': True
         }), 400
     
-    if not password:
-        return jsonify({'success': False, 'error': 'Password is required'}), 400
-    
     if not verify_password(password, user['password_hash']):
-        return jsonify({'success': False, 'error': 'Incorrect password'}), 400
+        return jsonify({'success': False, 'error': 'Incorrect email or password'}), 400
     
     # Log the user in
     session.permanent = True
@@ -1503,7 +2134,7 @@ def api_get_current_user():
     if not user:
         return jsonify({'success': False, 'logged_in': False}), 401
     
-    return jsonify({
+    response = jsonify({
         'success': True,
         'logged_in': True,
         'user': {
@@ -1513,6 +2144,11 @@ def api_get_current_user():
             'email_verified': user['email_verified']
         }
     })
+    # Pages poll this on every navigation; let the browser revalidate with
+    # If-None-Match and get a bodiless 304 while credits are unchanged
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route('/api/create-checkout', methods=['POST'])
@@ -1522,10 +2158,11 @@ def create_checkout():
     search_type = data.get('search_type', 'number')
     search_value = data.get('search_value', '').strip()
     
-    if not search_value:
+    value_error = search_value_error(search_type, search_value)
+    if value_error:
         return jsonify({
             'success': False,
-            'error': 'Search value is required'
+            'error': value_error
         }), 400
     
     if search_type not in SEARCH_PRICES:
@@ -1535,23 +2172,16 @@ def create_checkout():
         }), 400
 
     # Check if Stripe is configured
-    if not stripe.api_key or stripe.api_key == 'sk_test_your_secret_key_here':
+    if not stripe_configured():
         return jsonify({
             'success': False,
             'error': 'Payment system not configured. Please contact support.'
         }), 500
+    stripe = get_stripe()
     
     price_pence = SEARCH_PRICES[search_type]
     price_display = f"£{price_pence / 100:.2f}"
     
-    # Determine the search type label for display
-    search_type_labels = {
-        'name': 'Company Name Search',
-        'number': 'Company Number Search',
-        'address': 'Address Search',
-        'director': 'Director Search'
-    }
-    
     try:
         # Get the base URL for redirects
         base_url = request.url_root.rstrip('/')
@@ -1563,7 +2193,7 @@ def create_checkout():
                 'price_data': {
                     'currency': 'gbp',
                     'product_data': {
-                        'name': search_type_labels.get(search_type, 'Registry Search'),
+                        'name': SEARCH_TYPE_LABELS.get(search_type, 'Registry Search'),
                         'description': f'Search for: {search_value[:50]}{"..." if len(search_value) > 50 else ""}'
                     },
                     'unit_amount': price_pence,
@@ -1571,7 +2201,7 @@ def create_checkout():
                 'quantity': 1,
             }],
             mode='payment',
-            success_url=f'{base_url}/search?session_id={{CHECKOUT_SESSION_ID}}&search_type={search_type}&search_value={requests.utils.quote(search_value)}',
+            success_url=f'{base_url}/search?session_id={{CHECKOUT_SESSION_ID}}&search_type={search_type}&search_value={quote(search_value, safe="")}',
             cancel_url=f'{base_url}/search?cancelled=true',
             metadata={
                 'search_type': search_type,
@@ -1605,17 +2235,21 @@ def verify_stripe_payment(session_id, expected_search_type, expected_search_valu
     if not session_id:
         return False, "Payment required. Please complete checkout to search."
     
-    # Check if session was already used (in-memory + database)
-    if session_id in used_sessions or is_payment_used(session_id):
+    # Fast reject for sessions this process has already consumed
+    if is_session_marked_used(session_id):
         return False, "This payment has already been used. Please make a new payment to search again."
     
+    stripe = get_stripe()
     try:
-        # Retrieve the session from Stripe
-        session = stripe.checkout.Session.retrieve(session_id)
+        # Retrieve the session from Stripe unless it was already seen paid
+        session = _stripe_session_cache.get(session_id)
+        if session is None:
+            session = stripe.checkout.Session.retrieve(session_id)
         
-        # Verify payment was successful
+        # Verify payment was successful (unpaid sessions may still complete, so aren't cached)
         if session.payment_status != 'paid':
             return False, "Payment not completed. Please complete checkout to search."
+        _stripe_session_cache.set(session_id, session, STRIPE_SESSION_CACHE_TTL)
         
         # Verify the search parameters match what was paid for
         metadata = session.metadata or {}
@@ -1628,13 +2262,13 @@ def verify_stripe_payment(session_id, expected_search_type, expected_search_valu
         if paid_search_value.strip().lower() != expected_search_value.strip().lower():
             return False, "Payment was for a different search query. Please make a new payment."
         
-        # Mark session as used (both in-memory and database for reliability)
-        used_sessions.add(session_id)
-        mark_payment_used(session_id)
-        
-        # Record the payment in the database (update status to 'used')
+        # Claim the session in the database; first use wins across all instances
         price_pence = SEARCH_PRICES.get(paid_search_type, 100)
-        record_payment(session_id, paid_search_type, paid_search_value, price_pence, 'used')
+        claimed = claim_payment(session_id, paid_search_type, paid_search_value, price_pence)
+        mark_session_used(session_id)
+        
+        if claimed is False:
+            return False, "This payment has already been used. Please make a new payment to search again."
         
         return True, None
         
@@ -1647,6 +2281,7 @@ def verify_stripe_payment(session_id, expected_search_type, expected_search_valu
 
 
 @app.route('/api/search/directors', methods=['POST'])
+@rate_limited
 def api_search_directors():
     """
     Stage 1: Search for directors by name (FREE - no credits required).
@@ -1682,14 +2317,8 @@ def api_search_directors():
 
     if not officers:
         # No individual officers found - suggest trying company name search instead
-        all_company_names = get_all_unique_company_names()
-        matches = process.extract(
-            director_name,
-            all_company_names,
-            scorer=fuzz.WRatio,
-            limit=5
-        )
-        suggestions = [{'name': m[0], 'similarity': round(m[1], 1)} for m in matches if m[1] >= 60]
+        matches = suggest_company_names(director_name, 60)
+        suggestions = [{'name': name, 'similarity': round(score, 1)} for name, score in matches]
         return jsonify({
             'success': False,
             'error': 'No individual directors found matching this name. Try searching by company name instead.',
@@ -1745,6 +2374,7 @@ def api_search_directors():
 
 
 @app.route('/api/search/director-properties', methods=['POST'])
+@rate_limited
 def api_search_director_properties():
     """
     Stage 2: Get properties for a specific director (REQUIRES credits/payment).
@@ -1769,20 +2399,19 @@ def api_search_director_properties():
     user = get_current_user()
     credit_cost = CREDIT_COSTS.get('director', 3)
     credits_used = False
+    remaining_credits = None
 
     # Check if user has unlimited access
     if user and user.get('is_unlimited'):
         credits_used = True
-    # Try to use credits if user is logged in
+    # Try to use credits if user is logged in (atomic check-and-debit)
     elif user and use_credits:
-        user_credits = get_user_credits(user['id'])
-        if user_credits >= credit_cost:
-            if deduct_credits(user['id'], credit_cost, 'director', f'Director search: {director_name[:50]}'):
-                credits_used = True
+        remaining_credits = deduct_credits(user['id'], credit_cost, 'director', f'Director search: {director_name[:50]}')
+        credits_used = remaining_credits is not None
 
     # If credits weren't used, verify payment
     if not credits_used:
-        if stripe.api_key and stripe.api_key != 'sk_test_your_secret_key_here':
+        if stripe_configured():
             is_valid, payment_error = verify_stripe_payment(session_id, 'director', director_name)
             if not is_valid:
                 price_pence = SEARCH_PRICES.get('director', 300)
@@ -1793,13 +2422,15 @@ def api_search_director_properties():
                     'price_pence': price_pence,
                     'price_display': f'£{price_pence / 100:.2f}',
                     'credit_cost': credit_cost,
-                    'user_credits': get_user_credits(user['id']) if user else 0,
+                    'user_credits': user['credits'] if user else 0,
                     'results': [],
                     'directors_found': []
                 })
 
-    # Get updated credits after potential deduction
-    remaining_credits = get_user_credits(user['id']) if user else 0
+    # Balance comes back from the debit; when no credits were spent (unlimited
+    # users, insufficient balance) it's unchanged from the row loaded this request
+    if remaining_credits is None:
+        remaining_credits = user['credits'] if user else 0
 
     # Fetch company appointments for this officer
     appointments = get_officer_appointments(officer_id)
@@ -1845,76 +2476,11 @@ def api_search_director_properties():
         })
 
     # Search Land Registry database for properties owned by these companies using normalized column
-    conn = get_db_connection()
-    cursor = dict_cursor(conn)
-
-    placeholders = ','.join(['%s'] * len(all_company_numbers))
-    company_list = [normalize_company_reg(cn) for cn in all_company_numbers]
-
-    if DATABASE_URL:
-        # PostgreSQL: use indexed normalized column
-        cursor.execute(f"""
-            SELECT
-                p.id,
-                p.title_number,
-                p.tenure,
-                p.property_address,
-                p.district,
-                p.county,
-                p.region,
-                p.postcode,
-                p.price_paid,
-                p.date_proprietor_added,
-                pr.proprietor_name,
-                pr.proprietorship_category,
-                pr.address_line_1,
-                pr.address_line_2,
-                pr.address_line_3,
-                pr.company_registration_no,
-                COALESCE(p.data_source, 'CCOD') as data_source,
-                pr.country_incorporated
-            FROM properties p
-            INNER JOIN proprietors pr ON p.id = pr.property_id
-            WHERE pr.company_reg_normalized IN ({placeholders})
-            ORDER BY pr.proprietor_name, p.property_address
-            LIMIT 500
-        """, company_list)
-    else:
-        # SQLite fallback: use function-based query
-        cursor.execute(f"""
-            SELECT
-                p.id,
-                p.title_number,
-                p.tenure,
-                p.property_address,
-                p.district,
-                p.county,
-                p.region,
-                p.postcode,
-                p.price_paid,
-                p.date_proprietor_added,
-                pr.proprietor_name,
-                pr.proprietorship_category,
-                pr.address_line_1,
-                pr.address_line_2,
-                pr.address_line_3,
-                pr.company_registration_no,
-                'CCOD' as data_source,
-                NULL as country_incorporated
-            FROM properties p
-            INNER JOIN proprietors pr ON p.id = pr.property_id
-            WHERE UPPER(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(pr.company_registration_no), '(', ''), ')', ''), ' ', ''), '-', ''))
-                  IN ({','.join(['?'] * len(company_list))})
-            ORDER BY pr.proprietor_name, p.property_address
-            LIMIT 500
-        """, company_list)
-
-    results = cursor.fetchall()
-    conn.close()
+    results = search_properties_by_company_numbers(all_company_numbers)
 
     return jsonify({
         'success': True,
-        'results': [dict(row) for row in results],
+        'results': results,
         'directors_found': directors_found,
         'count': len(results),
         'search_type': 'director',
@@ -1924,6 +2490,20 @@ def api_search_director_properties():
     })
 
 
+# Property searches by search_type: (search function, query builder, response key).
+# Name searches return (results, suggestions); the others return results only.
+PROPERTY_SEARCHES = {
+    'name': (search_properties_by_company_name, company_name_search_query, 'company_name'),
+    'address': (search_properties_by_address, address_search_query, 'address'),
+    'number': (search_properties_by_company, company_number_search_query, 'company_number'),
+}
+
+
+def property_search_type(search_type):
+    """Map a requested search_type onto PROPERTY_SEARCHES; unknown types search by company number"""
+    return search_type if search_type in PROPERTY_SEARCHES else 'number'
+
+
 @app.route('/api/search', methods=['POST'])
 def api_search():
     """API endpoint for searching properties"""
@@ -1933,36 +2513,55 @@ def api_search():
     session_id = data.get('session_id')  # Stripe Checkout Session ID
     use_credits = data.get('use_credits', True)  # Whether to use credits if available
     
-    if not search_value:
+    value_error = search_value_error(search_type, search_value)
+    if value_error:
         return jsonify({
             'success': False,
-            'error': 'Search value is required',
+            'error': value_error,
             'results': [],
             'count': 0,
             'suggestions': []
         })
     
+    # Optional pagination: only applied when the client sends 'page'
+    page = page_size = None
+    if 'page' in data:
+        try:
+            page = max(int(data.get('page') or 1), 1)
+            page_size = min(max(int(data.get('page_size') or SEARCH_PAGE_SIZE_MAX), 1), SEARCH_PAGE_SIZE_MAX)
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'page and page_size must be whole numbers',
+                'results': [],
+                'count': 0,
+                'suggestions': []
+            })
+    offset = (page - 1) * page_size if page else 0
+    
     # Get current user and check credits
     user = get_current_user()
     credit_cost = CREDIT_COSTS.get(search_type, 1)
     credits_used = False
+    remaining_credits = None
+    
+    # Only the first page is charged; later pages of a search this session has
+    # already paid for are served without debiting credits or claiming a payment again
+    already_paid = bool(page and page > 1) and search_already_paid(search_type, search_value)
 
     # Check if user has unlimited access (friends/family)
     if user and user.get('is_unlimited'):
         credits_used = True  # Unlimited users don't need credits
-    # Try to use credits first if user is logged in
-    elif user and use_credits:
-        user_credits = get_user_credits(user['id'])
-        if user_credits >= credit_cost:
-            # Deduct credits
-            if deduct_credits(user['id'], credit_cost, search_type, f'Search: {search_value[:50]}'):
-                credits_used = True
+    # Try to use credits first if user is logged in (atomic check-and-debit)
+    elif user and use_credits and not already_paid:
+        remaining_credits = deduct_credits(user['id'], credit_cost, search_type, f'Search: {search_value[:50]}')
+        credits_used = remaining_credits is not None
 
     # If credits weren't used, verify payment
-    if not credits_used:
+    if not credits_used and not already_paid:
         # Verify payment before executing search
         # Only require payment if Stripe is configured
-        if stripe.api_key and stripe.api_key != 'sk_test_your_secret_key_here':
+        if stripe_configured():
             is_valid, payment_error = verify_stripe_payment(session_id, search_type, search_value)
             if not is_valid:
                 price_pence = SEARCH_PRICES.get(search_type, 100)
@@ -1973,44 +2572,22 @@ def api_search():
                     'price_pence': price_pence,
                     'price_display': f'£{price_pence / 100:.2f}',
                     'credit_cost': credit_cost,
-                    'user_credits': get_user_credits(user['id']) if user else 0,
+                    'user_credits': user['credits'] if user else 0,
                     'results': [],
                     'count': 0,
                     'suggestions': []
                 })
+    
+    if not already_paid:
+        remember_paid_search(search_type, search_value)
 
-    # Get updated credits after potential deduction
-    remaining_credits = get_user_credits(user['id']) if user else 0
+    # Balance comes back from the debit; when no credits were spent (unlimited
+    # users, insufficient balance) it's unchanged from the row loaded this request
+    if remaining_credits is None:
+        remaining_credits = user['credits'] if user else 0
     
-    # Search by company number, name, address, or director
-    if search_type == 'name':
-        results, suggestions = search_properties_by_company_name(search_value)
-        search_key = 'company_name'
-        return jsonify({
-            'success': True,
-            'results': results,
-            'count': len(results),
-            'suggestions': suggestions,
-            'search_type': search_type,
-            'credits_used': credits_used,
-            'remaining_credits': remaining_credits,
-            search_key: search_value
-        })
-    elif search_type == 'address':
-        results = search_properties_by_address(search_value)
-        suggestions = []
-        search_key = 'address'
-        return jsonify({
-            'success': True,
-            'results': results,
-            'count': len(results),
-            'suggestions': suggestions,
-            'search_type': search_type,
-            'credits_used': credits_used,
-            'remaining_credits': remaining_credits,
-            search_key: search_value
-        })
-    elif search_type == 'director':
+    # Director searches fan out to Companies House; everything else is a cached property search
+    if search_type == 'director':
         results, directors_found, suggestions, error = search_properties_by_director(search_value)
         if error:
             return jsonify({
@@ -2034,97 +2611,146 @@ def api_search():
             'remaining_credits': remaining_credits,
             'director_name': search_value
         })
-    else:
-        results = search_properties_by_company(search_value)
-        suggestions = []
-        search_key = 'company_number'
-        return jsonify({
-            'success': True,
-            'results': results,
-            'count': len(results),
-            'suggestions': suggestions,
-            'search_type': search_type,
-            'credits_used': credits_used,
-            'remaining_credits': remaining_credits,
-            search_key: search_value
-        })
+    
+    cache_type = property_search_type(search_type)
+    search_fn, query_builder, search_key = PROPERTY_SEARCHES[cache_type]
+    results = cached_search(cache_type, search_value, search_fn, limit=page_size, offset=offset)
+    suggestions = []
+    if cache_type == 'name':
+        results, suggestions = results
+    return jsonify({
+        'success': True,
+        'results': results,
+        'count': len(results),
+        'suggestions': suggestions,
+        'search_type': search_type,
+        'credits_used': credits_used,
+        'remaining_credits': remaining_credits,
+        search_key: search_value,
+        **search_pagination(page, page_size, results, query_builder, search_value)
+    })
+
+
+# Export compression: level 5 keeps CPU low while text still shrinks ~5-10x
+EXPORT_GZIP_LEVEL = 5
+EXPORT_GZIP_MIN_SIZE = 1024
+
+# Column order for CSV exports; every property search query selects all of these
+EXPORT_FIELDNAMES = (
+    'title_number', 'tenure', 'property_address', 'district', 'county',
+    'region', 'postcode', 'price_paid', 'proprietor_name',
+    'company_registration_no', 'proprietorship_category', 'date_proprietor_added'
+)
+
+
+def client_accepts_gzip():
+    """Whether the current request's Accept-Encoding allows a gzip response"""
+    return 'gzip' in request.accept_encodings
+
+
+def _gzip_chunks(chunks):
+    """Gzip-compress an iterable of str or bytes chunks into a stream of bytes"""
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _CsvLineBuffer:
+    """File-like object for csv writers that returns each line instead of storing it"""
+
+    def write(self, value):
+        return value
 
 
 @app.route('/api/export/csv', methods=['POST'])
+@rate_limited
 def export_csv():
     """Export search results as CSV"""
     data = request.get_json()
     search_type = data.get('search_type', 'number')
     search_value = data.get('search_value', '').strip()
     
-    if not search_value:
-        return jsonify({'success': False, 'error': 'Search value is required'}), 400
-    
-    # Search by company number, name, address, or director
-    if search_type == 'name':
-        results, _ = search_properties_by_company_name(search_value)
-    elif search_type == 'address':
-        results = search_properties_by_address(search_value)
-    elif search_type == 'director':
+    value_error = search_value_error(search_type, search_value)
+    if value_error:
+        return jsonify({'success': False, 'error': value_error}), 400
+    
+    # Search by company number, name, address, or director.
+    # Director results come from the Companies House fan-out (capped at 500 rows),
+    # and a search the user just ran is exported from the search cache. Otherwise
+    # PostgreSQL formats the CSV with COPY ... WITH CSV and SQLite streams tuples
+    # from the cursor through csv.writer. Every path ends lines with \n, the
+    # terminator COPY uses, so an export is byte-identical however it's served.
+    writer = csv.writer(_CsvLineBuffer(), lineterminator='\n')
+    cached_results = None if search_type == 'director' else cached_property_results(search_type, search_value)
+    if search_type == 'director':
         results, _, _, error = search_properties_by_director(search_value)
         if error:
             return jsonify({'success': False, 'error': error}), 400
+        rows = map(operator.itemgetter(*EXPORT_FIELDNAMES), results)
+    elif cached_results is not None:
+        rows = map(operator.itemgetter(*EXPORT_FIELDNAMES), cached_results)
     else:
-        results = search_properties_by_company(search_value)
-    
-    if not results:
-        return jsonify({'success': False, 'error': 'No results to export'}), 400
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    fieldnames = [
-        'title_number', 'tenure', 'property_address', 'district', 'county',
-        'region', 'postcode', 'price_paid', 'proprietor_name',
-        'company_registration_no', 'proprietorship_category', 'date_proprietor_added'
-    ]
-    
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    
-    for row in results:
-        writer.writerow({k: row.get(k, '') for k in fieldnames})
-    
-    output.seek(0)
-    
-    # Create response
+        query = PROPERTY_SEARCHES[property_search_type(search_type)][1](search_value)
+        if DATABASE_URL:
+            spool = copy_property_csv(*query, EXPORT_FIELDNAMES)
+            if spool is None:
+                return jsonify({'success': False, 'error': 'No results to export'}), 400
+            rows = None
+        else:
+            rows = iter_property_rows(*query, EXPORT_FIELDNAMES)
+    
+    if rows is not None:
+        first_row = next(rows, None)
+        if first_row is None:
+            return jsonify({'success': False, 'error': 'No results to export'}), 400
+    
+    def generate():
+        # Each write() hands the formatted line back, so rows are yielded as produced
+        yield writer.writerow(EXPORT_FIELDNAMES)
+        if rows is None:
+            yield from _iter_spool(spool)
+            return
+        for row in itertools.chain([first_row], rows):
+            yield writer.writerow(row)
+    
+    # Create streaming response, gzip-compressed on the fly when the client accepts it
     filename = f"properties_{search_type}_{search_value.replace(' ', '_')[:20]}.csv"
-    response = app.response_class(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment; filename={filename}'}
-    )
-    
-    return response
+    headers = {'Content-Disposition': f'attachment; filename={filename}', 'Vary': 'Accept-Encoding'}
+    body = generate()
+    if client_accepts_gzip():
+        body = _gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(body), mimetype='text/csv', headers=headers)
 
 
 @app.route('/api/export/json', methods=['POST'])
+@rate_limited
 def export_json():
     """Export search results as JSON"""
     data = request.get_json()
     search_type = data.get('search_type', 'number')
     search_value = data.get('search_value', '').strip()
     
-    if not search_value:
-        return jsonify({'success': False, 'error': 'Search value is required'}), 400
+    value_error = search_value_error(search_type, search_value)
+    if value_error:
+        return jsonify({'success': False, 'error': value_error}), 400
     
-    # Search by company number, name, address, or director
-    if search_type == 'name':
-        results, _ = search_properties_by_company_name(search_value)
-        directors_found = []
-    elif search_type == 'address':
-        results = search_properties_by_address(search_value)
-        directors_found = []
-    elif search_type == 'director':
+    # Search by company number, name, address, or director; property searches
+    # share the unpaginated /api/search cache entries
+    if search_type == 'director':
         results, directors_found, _, error = search_properties_by_director(search_value)
         if error:
             return jsonify({'success': False, 'error': error}), 400
     else:
-        results = search_properties_by_company(search_value)
+        cache_type = property_search_type(search_type)
+        results = cached_search(cache_type, search_value, PROPERTY_SEARCHES[cache_type][0], limit=None, offset=0)
+        if cache_type == 'name':
+            results = results[0]
         directors_found = []
     
     response_data = {
@@ -2138,12 +2764,48 @@ def export_json():
     if search_type == 'director' and directors_found:
         response_data['directors_found'] = directors_found
     
-    return jsonify(response_data)
+    # orjson serializes multi-MB exports in C; dates and Decimals are routed through
+    # _orjson_default so the output matches what jsonify produced
+    body = orjson.dumps(response_data, default=_orjson_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    response = Response(body, mimetype='application/json', headers={'Vary': 'Accept-Encoding'})
+    if len(body) >= EXPORT_GZIP_MIN_SIZE and client_accepts_gzip():
+        response.set_data(gzip.compress(body, compresslevel=EXPORT_GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+# Background data reloads started from /api/reload (local development only)
+RELOAD_LOG_TAIL_BYTES = 65536
+_reload_jobs = {}
+_reload_jobs_lock = threading.Lock()
+
+
+def _read_log_tail(log_path, max_bytes=RELOAD_LOG_TAIL_BYTES):
+    """Return the last max_bytes of a log file without reading the whole file"""
+    try:
+        with open(log_path, 'rb') as log_file:
+            size = os.fstat(log_file.fileno()).st_size
+            return os.pread(log_file.fileno(), max_bytes, max(0, size - max_bytes)).decode('utf-8', errors='replace')
+    except OSError:
+        return ''
+
+
+def _invalidate_after_reload(job):
+    """Drop the search caches once for a reload that succeeded"""
+    if job['process'].poll() == 0 and not job.get('caches_invalidated'):
+        invalidate_search_caches()
+        job['caches_invalidated'] = True
+
+
+def _watch_reload(job):
+    """Wait for a reload to exit and invalidate straight away, whether or not anyone polls its status"""
+    job['process'].wait()
+    _invalidate_after_reload(job)
 
 
 @app.route('/api/reload', methods=['POST'])
 def reload_data():
-    """Reload data from CSV - disabled in production (serverless)"""
+    """Start a background data reload from CSV - disabled in production (serverless)"""
     if DATABASE_URL:
         return jsonify({
             'success': False,
@@ -2152,26 +2814,41 @@ def reload_data():
     
     try:
         import subprocess
-        script_path = BASE_DIR / 'scripts' / 'load_data.py'
-        result = subprocess.run(
-            ['python', str(script_path)],
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minute timeout
-        )
         
-        if result.returncode == 0:
-            return jsonify({
-                'success': True,
-                'message': 'Data reloaded successfully',
-                'output': result.stdout
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to reload data',
-                'output': result.stderr
-            }), 500
+        with _reload_jobs_lock:
+            if any(job['process'].poll() is None for job in _reload_jobs.values()):
+                return jsonify({
+                    'success': False,
+                    'error': 'A data reload is already running'
+                }), 409
+            
+            # Only the latest job is kept: the earlier ones have all finished, so
+            # drop their process handles and logs rather than holding them forever
+            for job in _reload_jobs.values():
+                _invalidate_after_reload(job)
+                job['log_path'].unlink(missing_ok=True)
+            _reload_jobs.clear()
+            
+            # Output goes straight to a log file, so it never accumulates in this process
+            job_id = secrets.token_urlsafe(8)
+            log_path = Path(tempfile.gettempdir()) / f'reload-{job_id}.log'
+            script_path = BASE_DIR / 'scripts' / 'load_data.py'
+            with open(log_path, 'wb') as log_file:
+                process = subprocess.Popen(
+                    ['python', str(script_path)],
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True
+                )
+            job = {'process': process, 'log_path': log_path}
+            _reload_jobs[job_id] = job
+            threading.Thread(target=_watch_reload, args=(job,), daemon=True).start()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Data reload started',
+            'job_id': job_id
+        }), 202
     except Exception as e:
         return jsonify({
             'success': False,
@@ -2179,6 +2856,32 @@ def reload_data():
         }), 500
 
 
+@app.route('/api/reload/status/<job_id>')
+def reload_status(job_id):
+    """Report progress of a background data reload"""
+    job = _reload_jobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Unknown reload job'}), 404
+    
+    returncode = job['process'].poll()
+    if returncode is None:
+        status = 'running'
+    elif returncode == 0:
+        status = 'succeeded'
+        # The reload replaced the data, so cached names and results are stale.
+        # The watcher thread normally got here first; this covers a poll racing it
+        _invalidate_after_reload(job)
+    else:
+        status = 'failed'
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': status,
+        'output': _read_log_tail(job['log_path'])
+    })
+
+
 if __name__ == '__main__':
     # Check if database exists (local development only)
     if not DATABASE_URL and not LOCAL_DATABASE_PATH.exists():
@@ -112,12 +112,19 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
             });
 
-            const data = await response.json();
+            let data = await response.json();
+
+            // The reload runs in the background; poll until it finishes
+            while (data.success && data.job_id && data.status !== 'succeeded' && data.status !== 'failed') {
+                await new Promise(resolve => setTimeout(resolve, 2000));
+                const statusResponse = await fetch(`/api/reload/status/${encodeURIComponent(data.job_id)}`);
+                data = await statusResponse.json();
+            }
 
-            if (data.success) {
+            if (data.success && data.status === 'succeeded') {
                 alert('Data reloaded successfully!');
             } else {
-                alert('Error reloading data: ' + (data.error || 'Unknown error'));
+                alert('Error reloading data: ' + (data.error || 'Reload failed'));
             }
         } catch (error) {
             alert('Error reloading data: ' + error.message);
@@ -29,11 +29,13 @@ CREATE TABLE IF NOT EXISTS proprietors (
     address_line_1 TEXT,
     address_line_2 TEXT,
     address_line_3 TEXT,
+    company_reg_normalized TEXT NOT NULL DEFAULT '', -- uppercase, no spaces/hyphens/parentheses (set by the loader)
     FOREIGN KEY (property_id) REFERENCES properties(id) ON DELETE CASCADE
 );
 
 -- Indexes for fast lookups
 CREATE INDEX IF NOT EXISTS idx_company_registration_no ON proprietors(company_registration_no);
+CREATE INDEX IF NOT EXISTS idx_company_reg_normalized ON proprietors(company_reg_normalized);
 CREATE INDEX IF NOT EXISTS idx_property_id ON proprietors(property_id);
 CREATE INDEX IF NOT EXISTS idx_title_number ON properties(title_number);
 CREATE INDEX IF NOT EXISTS idx_postcode ON properties(postcode);
@@ -53,8 +55,7 @@ CREATE TABLE IF NOT EXISTS payments (
     used_at TIMESTAMP
 );
 
--- Index for fast payment lookup by session ID
-CREATE INDEX IF NOT EXISTS idx_stripe_session_id ON payments(stripe_session_id);
+-- Session ID lookups use the UNIQUE constraint's index
 CREATE INDEX IF NOT EXISTS idx_payment_status ON payments(status);
 
 -- ============================================
@@ -102,12 +103,9 @@ CREATE TABLE IF NOT EXISTS password_reset_tokens (
     used_at TIMESTAMP
 );
 
--- Indexes for user system
-CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
-CREATE INDEX IF NOT EXISTS idx_magic_links_token ON magic_links(token);
+-- Indexes for user system (email and token lookups use the UNIQUE constraints' indexes)
 CREATE INDEX IF NOT EXISTS idx_magic_links_user_id ON magic_links(user_id);
 CREATE INDEX IF NOT EXISTS idx_credit_transactions_user_id ON credit_transactions(user_id);
-CREATE INDEX IF NOT EXISTS idx_password_reset_token ON password_reset_tokens(token);
 
 -- ============================================
 -- PERFORMANCE OPTIMIZATION: Normalized Columns & Indexes (PostgreSQL only)
@@ -119,13 +117,13 @@ CREATE INDEX IF NOT EXISTS idx_password_reset_token ON password_reset_tokens(tok
 --   proprietors.company_reg_normalized - uppercase, no spaces/hyphens/parentheses (indexed)
 --   proprietors.proprietor_name_upper - uppercase trimmed name (trigram indexed)
 --   properties.property_address_upper - uppercase trimmed address (trigram indexed)
---   properties.postcode_upper - uppercase trimmed postcode (trigram indexed)
+--   properties.postcode_upper - uppercase trimmed postcode (btree indexed for prefix matches)
 --
 -- Indexes created:
 --   idx_company_reg_normalized - B-tree index for exact company number matches
 --   idx_proprietor_name_trgm - GIN trigram index for LIKE '%term%' queries on names
---   idx_property_address_trgm - GIN trigram index for LIKE '%term%' queries on addresses
---   idx_postcode_trgm - GIN trigram index for LIKE '%term%' queries on postcodes
+--   idx_property_address_left_trgm - GIN trigram index on LEFT(property_address_upper, 200) for LIKE '%term%' queries on addresses
+--   idx_postcode_upper - B-tree (text_pattern_ops) index for LIKE 'term%' queries on postcodes
 --
 -- Performance improvements:
 --   - Company number search: ~100x faster (index lookup vs full table scan)
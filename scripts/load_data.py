@@ -4,6 +4,7 @@ Loads CSV data into SQLite database with validation and logging
 """
 
 import csv
+import operator
 import sqlite3
 import os
 import sys
@@ -24,6 +25,25 @@ def normalize_company_number(company_no):
     return company_no.strip().upper()
 
 
+_COMPANY_REG_STRIP = str.maketrans('', '', '() -')
+
+
+def normalize_company_reg(value):
+    """Normalize company registration number - matches main.py logic"""
+    if not value:
+        return ''
+    return value.strip().upper().translate(_COMPANY_REG_STRIP)
+
+
+def ensure_normalized_columns(cursor):
+    """Add the normalized company number column to databases created before it existed"""
+    cursor.execute("PRAGMA table_info(proprietors)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if 'company_reg_normalized' not in columns:
+        cursor.execute("ALTER TABLE proprietors ADD COLUMN company_reg_normalized TEXT NOT NULL DEFAULT ''")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_reg_normalized ON proprietors(company_reg_normalized)")
+
+
 def create_database():
     """Create database schema"""
     conn = sqlite3.connect(DATABASE_PATH)
@@ -46,6 +66,76 @@ def create_database():
     return True
 
 
+BATCH_SIZE = 10000
+
+PROPERTY_INSERT_SQL = """
+    INSERT INTO properties
+    (id, title_number, tenure, property_address, district, county, region,
+     postcode, multiple_address_indicator, price_paid,
+     date_proprietor_added, additional_proprietor_indicator)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+PROPRIETOR_INSERT_SQL = """
+    INSERT INTO proprietors
+    (property_id, proprietor_number, proprietor_name, company_registration_no,
+     proprietorship_category, address_line_1, address_line_2, address_line_3,
+     company_reg_normalized)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+PROPERTY_CSV_COLUMNS = (
+    'Title Number', 'Tenure', 'Property Address', 'District', 'County', 'Region',
+    'Postcode', 'Multiple Address Indicator', 'Price Paid',
+    'Date Proprietor Added', 'Additional Proprietor Indicator'
+)
+
+
+def proprietor_csv_columns(prop_num):
+    """CSV columns for proprietor prop_num, in the order load_csv_data unpacks them"""
+    return (
+        f'Company Registration No. ({prop_num})',
+        f'Proprietor Name ({prop_num})',
+        f'Proprietorship Category ({prop_num})',
+        f'Proprietor ({prop_num}) Address (1)',
+        f'Proprietor ({prop_num}) Address (2)',
+        f'Proprietor ({prop_num}) Address (3)',
+    )
+
+
+def column_getter(header, names):
+    """
+    itemgetter returning the named columns of a csv.reader row as a tuple. Columns
+    missing from the header map to index len(header), where the loader appends ''.
+    """
+    positions = {name: i for i, name in enumerate(header)}
+    indexes = [positions.get(name, len(header)) for name in names]
+    return operator.itemgetter(*indexes)
+
+
+def configure_bulk_load(cursor):
+    """Trade durability for speed: the load rebuilds the tables from the CSV anyway"""
+    # WAL lets the app keep reading the previous data while a reload runs
+    # (readers would otherwise be locked out once the load spills its cache)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-200000")  # ~200 MB
+
+
+def drop_data_indexes(cursor):
+    """Drop the properties/proprietors indexes and return their SQL for recreating after the load"""
+    cursor.execute("""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND tbl_name IN ('properties', 'proprietors') AND sql IS NOT NULL
+    """)
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+    return [sql for _, sql in indexes]
+
+
 def load_csv_data():
     """Load CSV data into database"""
     if not os.path.exists(CSV_PATH):
@@ -60,11 +150,9 @@ def load_csv_data():
     
     conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
-    
-    # Clear existing data
-    cursor.execute("DELETE FROM proprietors")
-    cursor.execute("DELETE FROM properties")
+    ensure_normalized_columns(cursor)
     conn.commit()
+    configure_bulk_load(cursor)
     
     stats = {
         'total_rows': 0,
@@ -78,47 +166,57 @@ def load_csv_data():
     print("This may take a few minutes for large files...")
     
     try:
+        # Clear existing data and reload in one transaction; indexes are rebuilt
+        # once at the end instead of being updated on every insert
+        cursor.execute("DELETE FROM proprietors")
+        cursor.execute("DELETE FROM properties")
+        index_sql = drop_data_indexes(cursor)
+        
+        # Property ids are assigned here so proprietor rows can reference them
+        # without a per-row lastrowid, which lets both tables use executemany
+        property_id = 0
+        property_batch = []
+        proprietor_batch = []
+        
         with open(CSV_PATH, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
+            # Positional rows avoid building a dict per CSV line; column positions
+            # are resolved once from the header
+            reader = csv.reader(csvfile)
+            header = next(reader, [])
+            width = len(header)
+            property_values = column_getter(header, PROPERTY_CSV_COLUMNS)
+            proprietor_values = [
+                (prop_num, column_getter(header, proprietor_csv_columns(prop_num)))
+                for prop_num in range(1, 5)
+            ]
             
             for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
                 stats['total_rows'] += 1
                 
-                if row_num % 10000 == 0:
+                if row_num % BATCH_SIZE == 0:
+                    cursor.executemany(PROPERTY_INSERT_SQL, property_batch)
+                    cursor.executemany(PROPRIETOR_INSERT_SQL, proprietor_batch)
+                    property_batch.clear()
+                    proprietor_batch.clear()
                     print(f"Processed {row_num:,} rows...")
-                    conn.commit()  # Periodic commits for large files
                 
                 try:
-                    # Insert property
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO properties 
-                        (title_number, tenure, property_address, district, county, region, 
-                         postcode, multiple_address_indicator, price_paid, 
-                         date_proprietor_added, additional_proprietor_indicator)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        row.get('Title Number', '').strip(),
-                        row.get('Tenure', '').strip(),
-                        row.get('Property Address', '').strip(),
-                        row.get('District', '').strip(),
-                        row.get('County', '').strip(),
-                        row.get('Region', '').strip(),
-                        row.get('Postcode', '').strip(),
-                        row.get('Multiple Address Indicator', '').strip(),
-                        row.get('Price Paid', '').strip(),
-                        row.get('Date Proprietor Added', '').strip(),
-                        row.get('Additional Proprietor Indicator', '').strip()
-                    ))
+                    if len(row) < width:
+                        raise ValueError(f"expected {width} fields, found {len(row)}")
+                    # Extra trailing fields are dropped first, so index width is
+                    # always the '' for columns missing from the header
+                    del row[width:]
+                    row.append('')
                     
-                    property_id = cursor.lastrowid
-                    stats['properties_inserted'] += 1
+                    property_row = (property_id + 1, *(value.strip() for value in property_values(row)))
                     
-                    # Insert proprietors (up to 4)
-                    for prop_num in range(1, 5):
-                        company_no = normalize_company_number(
-                            row.get(f'Company Registration No. ({prop_num})', '')
-                        )
-                        proprietor_name = row.get(f'Proprietor Name ({prop_num})', '').strip()
+                    # Collect proprietors (up to 4)
+                    proprietor_rows = []
+                    skipped_empty_company = 0
+                    for prop_num, values in proprietor_values:
+                        company_raw, name_raw, category, address_1, address_2, address_3 = values(row)
+                        company_no = normalize_company_number(company_raw)
+                        proprietor_name = name_raw.strip()
                         
                         # Skip if no company number and no proprietor name
                         if not company_no and not proprietor_name:
@@ -126,30 +224,41 @@ def load_csv_data():
                         
                         # Track if we skip rows with no company number (user wants companies only)
                         if not company_no:
-                            stats['skipped_empty_company'] += 1
+                            skipped_empty_company += 1
                             continue
                         
-                        cursor.execute("""
-                            INSERT OR REPLACE INTO proprietors
-                            (property_id, proprietor_number, proprietor_name, company_registration_no,
-                             proprietorship_category, address_line_1, address_line_2, address_line_3)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            property_id,
+                        proprietor_rows.append((
+                            property_id + 1,
                             prop_num,
                             proprietor_name,
                             company_no,
-                            row.get(f'Proprietorship Category ({prop_num})', '').strip(),
-                            row.get(f'Proprietor ({prop_num}) Address (1)', '').strip(),
-                            row.get(f'Proprietor ({prop_num}) Address (2)', '').strip(),
-                            row.get(f'Proprietor ({prop_num}) Address (3)', '').strip()
+                            category.strip(),
+                            address_1.strip(),
+                            address_2.strip(),
+                            address_3.strip(),
+                            normalize_company_reg(company_no)
                         ))
-                        stats['proprietors_inserted'] += 1
                 
                 except Exception as e:
                     stats['errors'] += 1
                     if stats['errors'] <= 5:  # Only print first 5 errors
                         print(f"Error processing row {row_num}: {e}")
+                    continue
+                
+                property_id += 1
+                property_batch.append(property_row)
+                proprietor_batch.extend(proprietor_rows)
+                stats['properties_inserted'] += 1
+                stats['proprietors_inserted'] += len(proprietor_rows)
+                stats['skipped_empty_company'] += skipped_empty_company
+        
+        cursor.executemany(PROPERTY_INSERT_SQL, property_batch)
+        cursor.executemany(PROPRIETOR_INSERT_SQL, proprietor_batch)
+        
+        print("Rebuilding indexes...")
+        for sql in index_sql:
+            cursor.execute(sql)
+        cursor.execute("ANALYZE")
         
         conn.commit()
         print("\n" + "="*60)
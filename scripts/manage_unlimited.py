@@ -2,9 +2,13 @@
 Manage unlimited access for friends and family accounts.
 
 Usage:
-    python scripts/manage_unlimited.py grant user@example.com
-    python scripts/manage_unlimited.py revoke user@example.com
+    python scripts/manage_unlimited.py grant user@example.com [other@example.com ...]
+    python scripts/manage_unlimited.py revoke user@example.com [other@example.com ...]
+    python scripts/manage_unlimited.py grant --from-file users.txt
     python scripts/manage_unlimited.py list
+
+--from-file reads one email per line (blank lines and # comments are skipped).
+All emails in one invocation share a single connection and commit together.
 """
 import psycopg2
 import os
@@ -25,84 +29,100 @@ def get_connection():
     return psycopg2.connect(DATABASE_URL)
 
 
-def grant_unlimited(email):
-    """Grant unlimited access to a user"""
-    conn = get_connection()
+def user_exists(cursor, email):
+    """Check whether an account exists for an already-normalized email"""
+    cursor.execute("SELECT 1 FROM users WHERE email = %s", (email,))
+    return cursor.fetchone() is not None
+
+
+def grant_unlimited(conn, email):
+    """Grant unlimited access to a user (the caller commits)"""
     cursor = conn.cursor()
     
-    # Check if user exists
-    cursor.execute("SELECT id, email, is_unlimited FROM users WHERE LOWER(email) = LOWER(%s)", (email,))
-    user = cursor.fetchone()
+    # Emails are stored lowercased (see create_user in app/main.py), so an
+    # equality match can use the UNIQUE index on email. The flag is flipped in
+    # the same statement; only a no-op falls through to the existence check
+    email = email.strip().lower()
+    cursor.execute(
+        "UPDATE users SET is_unlimited = TRUE WHERE email = %s AND NOT is_unlimited RETURNING id",
+        (email,)
+    )
+    updated = cursor.fetchone()
     
-    if not user:
+    if not updated:
+        if user_exists(cursor, email):
+            print(f"User '{email}' already has unlimited access.")
+            return True
         print(f"User '{email}' not found. They need to create an account first.")
-        conn.close()
         return False
     
-    if user[2]:  # is_unlimited
-        print(f"User '{email}' already has unlimited access.")
-        conn.close()
-        return True
-    
-    cursor.execute("UPDATE users SET is_unlimited = TRUE WHERE id = %s", (user[0],))
-    conn.commit()
-    conn.close()
-    
     print(f"✓ Granted unlimited access to '{email}'")
     return True
 
 
-def revoke_unlimited(email):
-    """Revoke unlimited access from a user"""
-    conn = get_connection()
+def revoke_unlimited(conn, email):
+    """Revoke unlimited access from a user (the caller commits)"""
     cursor = conn.cursor()
     
-    cursor.execute("SELECT id, email, is_unlimited FROM users WHERE LOWER(email) = LOWER(%s)", (email,))
-    user = cursor.fetchone()
+    email = email.strip().lower()
+    cursor.execute(
+        "UPDATE users SET is_unlimited = FALSE WHERE email = %s AND is_unlimited RETURNING id",
+        (email,)
+    )
+    updated = cursor.fetchone()
     
-    if not user:
+    if not updated:
+        if user_exists(cursor, email):
+            print(f"User '{email}' doesn't have unlimited access.")
+            return True
         print(f"User '{email}' not found.")
-        conn.close()
         return False
     
-    if not user[2]:  # is_unlimited
-        print(f"User '{email}' doesn't have unlimited access.")
-        conn.close()
-        return True
-    
-    cursor.execute("UPDATE users SET is_unlimited = FALSE WHERE id = %s", (user[0],))
-    conn.commit()
-    conn.close()
-    
     print(f"✓ Revoked unlimited access from '{email}'")
     return True
 
 
-def list_unlimited():
+def list_unlimited(conn):
     """List all users with unlimited access"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT email, credits, created_at, last_login 
-        FROM users 
-        WHERE is_unlimited = TRUE 
-        ORDER BY email
-    """)
-    users = cursor.fetchall()
-    conn.close()
+    # Named cursor: rows stream from the server itersize at a time rather than
+    # being fetched into memory all at once
+    with conn.cursor(name='unlimited_users') as cursor:
+        cursor.itersize = 1000
+        cursor.execute("""
+            SELECT email, credits, created_at, last_login 
+            FROM users 
+            WHERE is_unlimited = TRUE 
+            ORDER BY email
+        """)
+        
+        count = 0
+        for user in cursor:
+            if count == 0:
+                print("\nUsers with unlimited access:")
+                print("-" * 60)
+            count += 1
+            last_login = user[3].strftime('%Y-%m-%d %H:%M') if user[3] else 'Never'
+            print(f"  {user[0]}")
+            print(f"    Credits: {user[1]} | Last login: {last_login}")
     
-    if not users:
+    if not count:
         print("No users have unlimited access.")
         return
     
-    print(f"\nUsers with unlimited access ({len(users)}):")
-    print("-" * 60)
-    for user in users:
-        last_login = user[3].strftime('%Y-%m-%d %H:%M') if user[3] else 'Never'
-        print(f"  {user[0]}")
-        print(f"    Credits: {user[1]} | Last login: {last_login}")
     print("-" * 60)
+    print(f"{count} user(s) with unlimited access")
+
+
+def read_emails(args):
+    """Emails from the command line, or streamed from the file after --from-file"""
+    if args[0] == '--from-file':
+        with open(args[1]) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+        return
+    yield from args
 
 
 def main():
@@ -111,23 +131,30 @@ def main():
         sys.exit(1)
     
     command = sys.argv[1].lower()
+    actions = {'grant': grant_unlimited, 'revoke': revoke_unlimited}
     
-    if command == 'list':
-        list_unlimited()
-    elif command == 'grant':
-        if len(sys.argv) < 3:
-            print("Usage: python scripts/manage_unlimited.py grant user@example.com")
-            sys.exit(1)
-        grant_unlimited(sys.argv[2])
-    elif command == 'revoke':
-        if len(sys.argv) < 3:
-            print("Usage: python scripts/manage_unlimited.py revoke user@example.com")
-            sys.exit(1)
-        revoke_unlimited(sys.argv[2])
-    else:
+    if command != 'list' and command not in actions:
         print(f"Unknown command: {command}")
         print(__doc__)
         sys.exit(1)
+    
+    if command in actions and sys.argv[2:] in ([], ['--from-file']):
+        print(f"Usage: python scripts/manage_unlimited.py {command} user@example.com [...]")
+        sys.exit(1)
+    
+    # One connection for the whole run; Neon connects slowly from cold
+    conn = get_connection()
+    try:
+        if command == 'list':
+            list_unlimited(conn)
+            return
+        
+        action = actions[command]
+        for email in read_emails(sys.argv[2:]):
+            action(conn, email)
+        conn.commit()
+    finally:
+        conn.close()
 
 
 if __name__ == '__main__':
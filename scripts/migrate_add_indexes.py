@@ -8,6 +8,7 @@ Run this script AFTER migrating data to PostgreSQL (after migrate_to_postgres.py
 import psycopg2
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 def log(msg):
@@ -21,12 +22,23 @@ load_dotenv('env.local')
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Per-connection settings for the index builds
+INDEX_PARALLEL_WORKERS = int(os.environ.get('INDEX_PARALLEL_WORKERS', 4))
+INDEX_MAINTENANCE_WORK_MEM = os.environ.get('INDEX_MAINTENANCE_WORK_MEM', '1GB')
+
+# How long the column step waits for its ACCESS EXCLUSIVE lock before giving up,
+# rather than queueing every other query on the table behind it
+COLUMN_LOCK_TIMEOUT = os.environ.get('COLUMN_LOCK_TIMEOUT', '10s')
+
+
+_COMPANY_REG_STRIP = str.maketrans('', '', '() -')
+
 
 def normalize_company_reg(value):
     """Normalize company registration number - matches main.py logic"""
     if not value:
         return ''
-    return value.strip().upper().replace('(', '').replace(')', '').replace(' ', '').replace('-', '')
+    return value.strip().upper().translate(_COMPANY_REG_STRIP)
 
 
 def normalize_text_upper(value):
@@ -37,15 +49,35 @@ def normalize_text_upper(value):
 
 
 def add_normalized_columns(pg_conn):
-    """Add normalized columns to tables"""
+    """
+    Add normalized columns as STORED generated columns. PostgreSQL computes them
+    while adding the column and on every later write, so there is no backfill
+    UPDATE. ADD COLUMN IF NOT EXISTS leaves an existing column alone, so tables
+    that already have plain normalized columns (including every table swapped
+    in by update_data.py, which fills them itself) keep them as they are.
+    
+    Adding a stored generated column rewrites the whole table under an ACCESS
+    EXCLUSIVE lock, so unlike the CONCURRENTLY index builds this step takes the
+    tables offline while it runs and needs a maintenance window.
+    """
     cursor = pg_conn.cursor()
     
+    log("  [WARN] Adding generated columns rewrites proprietors and properties under an")
+    log("         ACCESS EXCLUSIVE lock: all reads and writes block until each rewrite")
+    log("         finishes. Run this step in a maintenance window.")
+    cursor.execute("SET lock_timeout = %s", (COLUMN_LOCK_TIMEOUT,))
+    pg_conn.commit()
+    
     log("Adding normalized columns to proprietors table...")
     try:
         cursor.execute("""
             ALTER TABLE proprietors 
-            ADD COLUMN IF NOT EXISTS company_reg_normalized TEXT NOT NULL DEFAULT '',
-            ADD COLUMN IF NOT EXISTS proprietor_name_upper TEXT NOT NULL DEFAULT ''
+            ADD COLUMN IF NOT EXISTS company_reg_normalized TEXT GENERATED ALWAYS AS (
+                UPPER(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(COALESCE(company_registration_no, '')), '(', ''), ')', ''), ' ', ''), '-', ''))
+            ) STORED,
+            ADD COLUMN IF NOT EXISTS proprietor_name_upper TEXT GENERATED ALWAYS AS (
+                UPPER(TRIM(COALESCE(proprietor_name, '')))
+            ) STORED
         """)
         pg_conn.commit()
         log("  [OK] Added company_reg_normalized and proprietor_name_upper columns")
@@ -57,59 +89,35 @@ def add_normalized_columns(pg_conn):
     try:
         cursor.execute("""
             ALTER TABLE properties 
-            ADD COLUMN IF NOT EXISTS property_address_upper TEXT NOT NULL DEFAULT '',
-            ADD COLUMN IF NOT EXISTS postcode_upper TEXT NOT NULL DEFAULT ''
+            ADD COLUMN IF NOT EXISTS property_address_upper TEXT GENERATED ALWAYS AS (
+                UPPER(TRIM(COALESCE(property_address, '')))
+            ) STORED,
+            ADD COLUMN IF NOT EXISTS postcode_upper TEXT GENERATED ALWAYS AS (
+                UPPER(TRIM(COALESCE(postcode, '')))
+            ) STORED
         """)
         pg_conn.commit()
         log("  [OK] Added property_address_upper and postcode_upper columns")
     except Exception as e:
         log(f"  [WARN] Error adding columns (may already exist): {e}")
         pg_conn.rollback()
-
-
-def backfill_normalized_data(pg_conn):
-    """Populate normalized columns from existing data using efficient SQL"""
-    cursor = pg_conn.cursor()
-    
-    log("\nBackfilling normalized data in proprietors table...")
     
-    # Get count
-    cursor.execute("SELECT COUNT(*) FROM proprietors")
-    total = cursor.fetchone()[0]
-    log(f"  Total proprietors: {total:,}")
-    log("  Running SQL UPDATE (this may take a few minutes)...")
-    
-    # Use pure SQL for efficiency - PostgreSQL handles this much faster than Python loops
-    cursor.execute("""
-        UPDATE proprietors 
-        SET 
-            company_reg_normalized = UPPER(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(COALESCE(company_registration_no, '')), '(', ''), ')', ''), ' ', ''), '-', '')),
-            proprietor_name_upper = UPPER(TRIM(COALESCE(proprietor_name, '')))
-        WHERE company_reg_normalized = '' OR proprietor_name_upper = ''
-    """)
-    updated = cursor.rowcount
-    pg_conn.commit()
-    log(f"  [OK] Updated {updated:,} proprietors")
-    
-    log("\nBackfilling normalized data in properties table...")
-    
-    # Get count
-    cursor.execute("SELECT COUNT(*) FROM properties")
-    total = cursor.fetchone()[0]
-    log(f"  Total properties: {total:,}")
-    log("  Running SQL UPDATE (this may take a few minutes)...")
-    
-    # Use pure SQL for efficiency
     cursor.execute("""
-        UPDATE properties 
-        SET 
-            property_address_upper = UPPER(TRIM(COALESCE(property_address, ''))),
-            postcode_upper = UPPER(TRIM(COALESCE(postcode, '')))
-        WHERE property_address_upper = '' OR postcode_upper = ''
+        SELECT table_name || '.' || column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+        AND (table_name, column_name) IN (
+            ('proprietors', 'company_reg_normalized'), ('proprietors', 'proprietor_name_upper'),
+            ('properties', 'property_address_upper'), ('properties', 'postcode_upper')
+        )
+        AND is_generated = 'NEVER'
     """)
-    updated = cursor.rowcount
+    plain_columns = [row[0] for row in cursor.fetchall()]
+    cursor.execute("RESET lock_timeout")
     pg_conn.commit()
-    log(f"  [OK] Updated {updated:,} properties")
+    if plain_columns:
+        log(f"  [WARN] Existing plain (not generated) columns left unchanged: {', '.join(plain_columns)}")
+        log("         Their values come from the loader, not PostgreSQL")
 
 
 def create_indexes(pg_conn):
@@ -127,25 +135,89 @@ def create_indexes(pg_conn):
     
     log("\nCreating indexes...")
     
-    indexes = [
-        ("idx_company_reg_normalized", 
-         "CREATE INDEX IF NOT EXISTS idx_company_reg_normalized ON proprietors(company_reg_normalized)"),
-        ("idx_proprietor_name_trgm",
-         "CREATE INDEX IF NOT EXISTS idx_proprietor_name_trgm ON proprietors USING GIN (proprietor_name_upper gin_trgm_ops)"),
-        ("idx_property_address_trgm",
-         "CREATE INDEX IF NOT EXISTS idx_property_address_trgm ON properties USING GIN (property_address_upper gin_trgm_ops)"),
-        ("idx_postcode_trgm",
-         "CREATE INDEX IF NOT EXISTS idx_postcode_trgm ON properties USING GIN (postcode_upper gin_trgm_ops)")
-    ]
+    # Grouped by table: concurrent builds on the same table lock each other out,
+    # so each table's indexes are built in turn while the two tables build in parallel
+    indexes_by_table = {
+        'proprietors': [
+            ("idx_company_reg_normalized", 
+             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_company_reg_normalized ON proprietors(company_reg_normalized)"),
+            ("idx_proprietor_name_trgm",
+             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_proprietor_name_trgm ON proprietors USING GIN (proprietor_name_upper gin_trgm_ops)"),
+        ],
+        'properties': [
+            # Only the first 200 characters are indexed; the long tail of
+            # multi-line addresses otherwise bloats the trigram index
+            ("idx_property_address_left_trgm",
+             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_property_address_left_trgm ON properties USING GIN (LEFT(property_address_upper, 200) gin_trgm_ops)"),
+            # Postcodes are short and prefix-searched, so a btree beats a trigram GIN there
+            ("idx_postcode_upper",
+             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_postcode_upper ON properties (postcode_upper text_pattern_ops)"),
+        ],
+    }
+    
+    with ThreadPoolExecutor(max_workers=len(indexes_by_table)) as executor:
+        list(executor.map(build_table_indexes, indexes_by_table.values()))
     
-    for index_name, sql in indexes:
-        try:
-            cursor.execute(sql)
-            pg_conn.commit()
-            log(f"  [OK] Created index: {index_name}")
-        except Exception as e:
-            log(f"  [WARN] Error creating {index_name} (may already exist): {e}")
-            pg_conn.rollback()
+    # Superseded by idx_postcode_upper and idx_property_address_left_trgm
+    pg_conn.autocommit = True
+    try:
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_postcode_trgm")
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_property_address_trgm")
+    finally:
+        pg_conn.autocommit = False
+
+
+def build_table_indexes(indexes):
+    """Build one table's indexes in turn on a dedicated connection"""
+    pg_conn = psycopg2.connect(DATABASE_URL, connect_timeout=30)
+    # CONCURRENTLY keeps the tables writable while the indexes build, but it
+    # cannot run inside a transaction block
+    pg_conn.autocommit = True
+    try:
+        cursor = pg_conn.cursor()
+        cursor.execute("SET max_parallel_maintenance_workers = %s", (INDEX_PARALLEL_WORKERS,))
+        cursor.execute("SET maintenance_work_mem = %s", (INDEX_MAINTENANCE_WORK_MEM,))
+        for index_name, sql in indexes:
+            # A failed concurrent build leaves an INVALID index behind that
+            # IF NOT EXISTS would skip over, so clear it first
+            drop_invalid_index(cursor, index_name)
+            try:
+                cursor.execute(sql)
+                log(f"  [OK] Created index: {index_name}")
+            except Exception as e:
+                log(f"  [WARN] Error creating {index_name}: {e}")
+                drop_invalid_index(cursor, index_name)
+    finally:
+        pg_conn.close()
+
+
+def drop_invalid_index(cursor, index_name):
+    """Drop an index left INVALID by an interrupted CREATE INDEX CONCURRENTLY"""
+    cursor.execute(
+        "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)",
+        (index_name,)
+    )
+    row = cursor.fetchone()
+    if row and row[0]:
+        log(f"  [WARN] Dropping invalid index {index_name}")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def analyze_tables(pg_conn):
+    """
+    Collect statistics for the normalized columns so the planner costs the new
+    indexes correctly instead of falling back to default selectivity estimates
+    """
+    # Expression index statistics (the LEFT() trigram index) are only gathered
+    # by an ANALYZE without a column list, so properties is analyzed in full
+    pg_conn.autocommit = True
+    try:
+        cursor = pg_conn.cursor()
+        cursor.execute("ANALYZE proprietors (company_reg_normalized, proprietor_name_upper)")
+        cursor.execute("ANALYZE properties")
+        log("  [OK] Statistics updated")
+    finally:
+        pg_conn.autocommit = False
 
 
 def verify_migration(pg_conn):
@@ -154,41 +226,36 @@ def verify_migration(pg_conn):
     
     log("\n=== Verification ===")
     
-    # Check columns exist
+    # One statement for all the checks: each query is a round trip to Neon
     cursor.execute("""
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'proprietors' 
-        AND column_name IN ('company_reg_normalized', 'proprietor_name_upper')
+        SELECT
+            ARRAY(
+                SELECT column_name::text
+                FROM information_schema.columns 
+                WHERE table_name = 'proprietors' 
+                AND column_name IN ('company_reg_normalized', 'proprietor_name_upper')
+            ),
+            ARRAY(
+                SELECT column_name::text
+                FROM information_schema.columns 
+                WHERE table_name = 'properties' 
+                AND column_name IN ('property_address_upper', 'postcode_upper')
+            ),
+            ARRAY(
+                SELECT indexname::text
+                FROM pg_indexes 
+                WHERE schemaname = 'public' 
+                AND indexname IN ('idx_company_reg_normalized', 'idx_proprietor_name_trgm', 
+                                  'idx_property_address_left_trgm', 'idx_postcode_upper')
+            ),
+            (SELECT COUNT(*) FROM proprietors WHERE company_reg_normalized != ''),
+            (SELECT COUNT(*) FROM properties WHERE property_address_upper != '')
     """)
-    prop_cols = [row[0] for row in cursor.fetchall()]
+    prop_cols, props_cols, indexes, prop_count, props_count = cursor.fetchone()
     log(f"Proprietors normalized columns: {prop_cols}")
-    
-    cursor.execute("""
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'properties' 
-        AND column_name IN ('property_address_upper', 'postcode_upper')
-    """)
-    props_cols = [row[0] for row in cursor.fetchall()]
     log(f"Properties normalized columns: {props_cols}")
-    
-    # Check indexes exist
-    cursor.execute("""
-        SELECT indexname 
-        FROM pg_indexes 
-        WHERE schemaname = 'public' 
-        AND indexname IN ('idx_company_reg_normalized', 'idx_proprietor_name_trgm', 
-                          'idx_property_address_trgm', 'idx_postcode_trgm')
-    """)
-    indexes = [row[0] for row in cursor.fetchall()]
     log(f"Created indexes: {indexes}")
     
-    # Check data population
-    cursor.execute("SELECT COUNT(*) FROM proprietors WHERE company_reg_normalized != ''")
-    prop_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM properties WHERE property_address_upper != ''")
-    props_count = cursor.fetchone()[0]
     log(f"\nData populated:")
     log(f"  Proprietors with normalized data: {prop_count:,}")
     log(f"  Properties with normalized data: {props_count:,}")
@@ -206,12 +273,12 @@ def main():
         log("\n=== Adding Normalized Columns ===")
         add_normalized_columns(pg_conn)
         
-        log("\n=== Backfilling Normalized Data ===")
-        backfill_normalized_data(pg_conn)
-        
         log("\n=== Creating Indexes ===")
         create_indexes(pg_conn)
         
+        log("\n=== Analyzing Tables ===")
+        analyze_tables(pg_conn)
+        
         log("\n=== Verifying Migration ===")
         verify_migration(pg_conn)
         
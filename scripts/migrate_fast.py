@@ -3,15 +3,13 @@ Fast Migration script: SQLite to PostgreSQL (Neon)
 Uses PostgreSQL COPY command for 10-100x faster bulk loading.
 """
 
-import sqlite3
-import psycopg2
 import os
-import csv
-import io
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
+from pg_bulk import PROPERTY_COLUMNS, PROPRIETOR_COLUMNS, connect_for_bulk_load, copy_table_fast, copy_table_parallel, open_sqlite_source, vacuum_analyze
+
 # Force unbuffered output
 sys.stdout.reconfigure(line_buffering=True)
 
@@ -22,6 +20,8 @@ load_dotenv('env.local')
 BASE_DIR = Path(__file__).parent.parent
 SQLITE_PATH = BASE_DIR / 'property_data.db'
 DATABASE_URL = os.environ.get('DATABASE_URL')
+# Concurrent COPY streams for the proprietors table, the largest one
+COPY_WORKERS = int(os.environ.get('COPY_WORKERS', 4))
 
 def create_postgres_schema(pg_conn):
     """Create the PostgreSQL schema"""
@@ -99,50 +99,6 @@ def create_indexes(pg_conn):
     
     print("Indexes created!")
 
-def copy_table_fast(sqlite_conn, pg_conn, table_name, columns, batch_size=50000):
-    """Copy table using PostgreSQL COPY command with streaming CSV"""
-    sqlite_cursor = sqlite_conn.cursor()
-    pg_cursor = pg_conn.cursor()
-    
-    # Get total count
-    sqlite_cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-    total = sqlite_cursor.fetchone()[0]
-    print(f"\nMigrating {table_name}: {total:,} rows")
-    
-    # Select all data
-    cols_str = ', '.join(columns)
-    sqlite_cursor.execute(f"SELECT {cols_str} FROM {table_name}")
-    
-    count = 0
-    while True:
-        rows = sqlite_cursor.fetchmany(batch_size)
-        if not rows:
-            break
-        
-        # Create CSV in memory
-        buffer = io.StringIO()
-        writer = csv.writer(buffer, quoting=csv.QUOTE_MINIMAL)
-        for row in rows:
-            # Handle None values and escape
-            cleaned_row = ['' if v is None else str(v).replace('\x00', '') for v in row]
-            writer.writerow(cleaned_row)
-        
-        buffer.seek(0)
-        
-        # Use COPY command (much faster than INSERT)
-        pg_cursor.copy_expert(
-            f"COPY {table_name} ({cols_str}) FROM STDIN WITH CSV",
-            buffer
-        )
-        pg_conn.commit()
-        
-        count += len(rows)
-        pct = count * 100 // total
-        print(f"  {count:,} / {total:,} ({pct}%)")
-    
-    print(f"  Completed: {count:,} rows")
-    return count
-
 def main():
     if not DATABASE_URL:
         print("Error: DATABASE_URL not set. Please check your env.local file.")
@@ -153,10 +109,10 @@ def main():
         return
     
     print(f"Connecting to SQLite: {SQLITE_PATH}")
-    sqlite_conn = sqlite3.connect(SQLITE_PATH)
+    sqlite_conn = open_sqlite_source(SQLITE_PATH)
     
     print(f"Connecting to PostgreSQL (Neon)...")
-    pg_conn = psycopg2.connect(DATABASE_URL)
+    pg_conn = connect_for_bulk_load(DATABASE_URL)
     
     try:
         print("\n" + "="*50)
@@ -165,25 +121,20 @@ def main():
         
         create_postgres_schema(pg_conn)
         
-        # Migrate properties first (parent table)
-        properties_cols = [
-            'id', 'title_number', 'tenure', 'property_address', 'district', 'county',
-            'region', 'postcode', 'multiple_address_indicator', 'price_paid',
-            'date_proprietor_added', 'additional_proprietor_indicator'
-        ]
-        copy_table_fast(sqlite_conn, pg_conn, 'properties', properties_cols)
+        # Migrate properties first (parent table). Empty strings load as NULL,
+        # as they always have with this script's COPY load
+        copy_table_fast(sqlite_conn, pg_conn, 'properties', PROPERTY_COLUMNS, empty_as_null=True)
         
-        # Migrate proprietors
-        proprietors_cols = [
-            'id', 'property_id', 'proprietor_number', 'proprietor_name',
-            'company_registration_no', 'proprietorship_category',
-            'address_line_1', 'address_line_2', 'address_line_3'
-        ]
-        copy_table_fast(sqlite_conn, pg_conn, 'proprietors', proprietors_cols)
+        # Migrate proprietors, split across several connections
+        copy_table_parallel(SQLITE_PATH, DATABASE_URL, 'proprietors', PROPRIETOR_COLUMNS,
+                            workers=COPY_WORKERS, empty_as_null=True)
         
         # Create indexes after data load
         create_indexes(pg_conn)
         
+        print("\nAnalyzing tables...")
+        vacuum_analyze(pg_conn, ['properties', 'proprietors'])
+        
         print("\n" + "="*50)
         print("MIGRATION COMPLETE!")
         print("="*50)
@@ -18,30 +18,43 @@ print(f"Connecting to database...")
 conn = psycopg2.connect(DATABASE_URL)
 cursor = conn.cursor()
 
-# Create payments table
-print("Creating payments table...")
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS payments (
-        id SERIAL PRIMARY KEY,
-        stripe_session_id VARCHAR(255) UNIQUE NOT NULL,
-        search_type VARCHAR(50) NOT NULL,
-        search_value TEXT NOT NULL,
-        amount_pence INTEGER NOT NULL,
-        currency VARCHAR(10) DEFAULT 'gbp',
-        status VARCHAR(50) DEFAULT 'pending',
-        customer_email VARCHAR(255),
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        completed_at TIMESTAMP,
-        used_at TIMESTAMP
-    )
-''')
-
-# Create indexes
-print("Creating indexes...")
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_stripe_session_id ON payments(stripe_session_id)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_payment_status ON payments(status)')
-
-conn.commit()
+# All DDL runs in one transaction so a dropped connection can't leave the
+# migration half applied; the timeout stops a stuck session from hanging it
+try:
+    cursor.execute("SET LOCAL statement_timeout = '60s'")
+    
+    # Create payments table
+    print("Creating payments table...")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payments (
+            id SERIAL PRIMARY KEY,
+            stripe_session_id VARCHAR(255) UNIQUE NOT NULL,
+            search_type VARCHAR(50) NOT NULL,
+            search_value TEXT NOT NULL,
+            amount_pence INTEGER NOT NULL,
+            currency VARCHAR(10) DEFAULT 'gbp',
+            status VARCHAR(50) DEFAULT 'pending',
+            customer_email VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            used_at TIMESTAMP
+        )
+    ''')
+
+    # Create indexes
+    print("Creating indexes...")
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_payment_status ON payments(status)')
+
+    # stripe_session_id lookups use the index behind its UNIQUE constraint;
+    # drop the duplicate plain index older versions of this script created
+    cursor.execute('DROP INDEX IF EXISTS idx_stripe_session_id')
+    
+    conn.commit()
+except Exception as e:
+    conn.rollback()
+    conn.close()
+    print(f"Migration failed, no changes applied: {e}")
+    exit(1)
 print('Payments table created successfully!')
 
 # Verify table exists
@@ -3,12 +3,12 @@ Migration script: SQLite to PostgreSQL (Neon)
 This script migrates data from the local SQLite database to Neon PostgreSQL.
 """
 
-import sqlite3
-import psycopg2
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from pg_bulk import PROPERTY_COLUMNS, PROPRIETOR_COLUMNS, connect_for_bulk_load, copy_table_fast, open_sqlite_source, vacuum_analyze
+
 # Load environment variables
 load_dotenv()
 load_dotenv('env.local')
@@ -29,7 +29,7 @@ def create_postgres_schema(pg_conn):
     cursor.execute("""
         CREATE TABLE properties (
             id SERIAL PRIMARY KEY,
-            title_number TEXT NOT NULL UNIQUE,
+            title_number TEXT NOT NULL,
             tenure TEXT,
             property_address TEXT NOT NULL,
             district TEXT,
@@ -48,119 +48,50 @@ def create_postgres_schema(pg_conn):
     cursor.execute("""
         CREATE TABLE proprietors (
             id SERIAL PRIMARY KEY,
-            property_id INTEGER NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+            property_id INTEGER NOT NULL,
             proprietor_number INTEGER NOT NULL,
             proprietor_name TEXT,
             company_registration_no TEXT,
             proprietorship_category TEXT,
             address_line_1 TEXT,
             address_line_2 TEXT,
-            address_line_3 TEXT,
-            UNIQUE(property_id, proprietor_number)
+            address_line_3 TEXT
         )
     """)
     
-    # Create indexes
+    pg_conn.commit()
+    print("PostgreSQL schema created (indexes and constraints are added after the data load).")
+
+def create_indexes(pg_conn):
+    """Create indexes, unique constraints and the foreign key once the data is loaded"""
+    cursor = pg_conn.cursor()
+    
+    # Building each index once over the loaded table is far cheaper than
+    # maintaining it (and checking the foreign key) for every copied row
+    cursor.execute("ALTER TABLE properties ADD CONSTRAINT properties_title_number_key UNIQUE (title_number)")
+    cursor.execute("ALTER TABLE proprietors ADD CONSTRAINT proprietors_property_id_proprietor_number_key UNIQUE (property_id, proprietor_number)")
     cursor.execute("CREATE INDEX idx_company_registration_no ON proprietors(company_registration_no)")
     cursor.execute("CREATE INDEX idx_property_id ON proprietors(property_id)")
     cursor.execute("CREATE INDEX idx_title_number ON properties(title_number)")
     cursor.execute("CREATE INDEX idx_postcode ON properties(postcode)")
     cursor.execute("CREATE INDEX idx_proprietor_name ON proprietors(proprietor_name)")
+    cursor.execute("ALTER TABLE proprietors ADD CONSTRAINT proprietors_property_id_fkey FOREIGN KEY (property_id) REFERENCES properties(id) ON DELETE CASCADE")
     
     pg_conn.commit()
-    print("PostgreSQL schema created successfully.")
+    print("Indexes and constraints created.")
 
-def migrate_data(sqlite_conn, pg_conn, batch_size=1000):
-    """Migrate data from SQLite to PostgreSQL"""
-    sqlite_cursor = sqlite_conn.cursor()
+def migrate_data(sqlite_conn, pg_conn):
+    """Migrate data from SQLite to PostgreSQL with COPY"""
     pg_cursor = pg_conn.cursor()
     
-    # Migrate properties
-    print("Migrating properties...")
-    sqlite_cursor.execute("SELECT COUNT(*) FROM properties")
-    total_properties = sqlite_cursor.fetchone()[0]
-    print(f"Total properties to migrate: {total_properties:,}")
-    
-    sqlite_cursor.execute("""
-        SELECT id, title_number, tenure, property_address, district, county, 
-               region, postcode, multiple_address_indicator, price_paid,
-               date_proprietor_added, additional_proprietor_indicator
-        FROM properties
-    """)
-    
-    count = 0
-    batch = []
-    for row in sqlite_cursor:
-        batch.append(row)
-        if len(batch) >= batch_size:
-            pg_cursor.executemany("""
-                INSERT INTO properties (id, title_number, tenure, property_address, district, county,
-                                       region, postcode, multiple_address_indicator, price_paid,
-                                       date_proprietor_added, additional_proprietor_indicator)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, batch)
-            pg_conn.commit()
-            count += len(batch)
-            print(f"  Migrated {count:,} / {total_properties:,} properties ({count*100//total_properties}%)")
-            batch = []
-    
-    if batch:
-        pg_cursor.executemany("""
-            INSERT INTO properties (id, title_number, tenure, property_address, district, county,
-                                   region, postcode, multiple_address_indicator, price_paid,
-                                   date_proprietor_added, additional_proprietor_indicator)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, batch)
-        pg_conn.commit()
-        count += len(batch)
-    
-    print(f"  Completed: {count:,} properties migrated.")
+    # Properties first, since proprietors reference them. Empty strings stay
+    # empty strings, as the old INSERT load kept them (title_number and
+    # property_address are NOT NULL)
+    copy_table_fast(sqlite_conn, pg_conn, 'properties', PROPERTY_COLUMNS, empty_as_null=False)
+    copy_table_fast(sqlite_conn, pg_conn, 'proprietors', PROPRIETOR_COLUMNS, empty_as_null=False)
     
-    # Reset the sequence for properties
+    # COPY writes explicit ids, so move the SERIAL sequences past them
     pg_cursor.execute("SELECT setval('properties_id_seq', (SELECT MAX(id) FROM properties))")
-    pg_conn.commit()
-    
-    # Migrate proprietors
-    print("\nMigrating proprietors...")
-    sqlite_cursor.execute("SELECT COUNT(*) FROM proprietors")
-    total_proprietors = sqlite_cursor.fetchone()[0]
-    print(f"Total proprietors to migrate: {total_proprietors:,}")
-    
-    sqlite_cursor.execute("""
-        SELECT id, property_id, proprietor_number, proprietor_name, company_registration_no,
-               proprietorship_category, address_line_1, address_line_2, address_line_3
-        FROM proprietors
-    """)
-    
-    count = 0
-    batch = []
-    for row in sqlite_cursor:
-        batch.append(row)
-        if len(batch) >= batch_size:
-            pg_cursor.executemany("""
-                INSERT INTO proprietors (id, property_id, proprietor_number, proprietor_name, 
-                                        company_registration_no, proprietorship_category,
-                                        address_line_1, address_line_2, address_line_3)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, batch)
-            pg_conn.commit()
-            count += len(batch)
-            print(f"  Migrated {count:,} / {total_proprietors:,} proprietors ({count*100//total_proprietors}%)")
-            batch = []
-    
-    if batch:
-        pg_cursor.executemany("""
-            INSERT INTO proprietors (id, property_id, proprietor_number, proprietor_name, 
-                                    company_registration_no, proprietorship_category,
-                                    address_line_1, address_line_2, address_line_3)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, batch)
-        pg_conn.commit()
-        count += len(batch)
-    
-    print(f"  Completed: {count:,} proprietors migrated.")
-    
-    # Reset the sequence for proprietors
     pg_cursor.execute("SELECT setval('proprietors_id_seq', (SELECT MAX(id) FROM proprietors))")
     pg_conn.commit()
 
@@ -174,10 +105,10 @@ def main():
         return
     
     print(f"Connecting to SQLite: {SQLITE_PATH}")
-    sqlite_conn = sqlite3.connect(SQLITE_PATH)
+    sqlite_conn = open_sqlite_source(SQLITE_PATH)
     
     print(f"Connecting to PostgreSQL...")
-    pg_conn = psycopg2.connect(DATABASE_URL)
+    pg_conn = connect_for_bulk_load(DATABASE_URL)
     
     try:
         print("\n=== Creating PostgreSQL Schema ===")
@@ -186,6 +117,12 @@ def main():
         print("\n=== Migrating Data ===")
         migrate_data(sqlite_conn, pg_conn)
         
+        print("\n=== Creating Indexes ===")
+        create_indexes(pg_conn)
+        
+        print("\n=== Analyzing Tables ===")
+        vacuum_analyze(pg_conn, ['properties', 'proprietors'])
+        
         print("\n=== Migration Complete! ===")
         
         # Verify counts
@@ -5,9 +5,12 @@ Migrate database to add user account system tables
 - credit_transactions: Track credit usage and purchases
 - password_reset_tokens: Store password reset tokens
 """
+import itertools
+import operator
 import psycopg2
 import os
 from dotenv import load_dotenv
+from migrate_add_indexes import drop_invalid_index
 
 load_dotenv()
 load_dotenv('env.local')
@@ -18,13 +21,9 @@ if not DATABASE_URL:
     print("Error: DATABASE_URL not set")
     exit(1)
 
-print(f"Connecting to database...")
-conn = psycopg2.connect(DATABASE_URL)
-cursor = conn.cursor()
-
-# Create users table
-print("Creating users table...")
-cursor.execute('''
+# All DDL goes to the server as one multi-statement string: one round trip
+# and one transaction instead of a round trip per statement
+DDL_SQL = '''
     CREATE TABLE IF NOT EXISTS users (
         id SERIAL PRIMARY KEY,
         email VARCHAR(255) UNIQUE NOT NULL,
@@ -34,33 +33,19 @@ cursor.execute('''
         email_verified BOOLEAN DEFAULT FALSE,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         last_login TIMESTAMP
-    )
-''')
-
-# Add is_unlimited column if it doesn't exist (for existing databases)
-print("Ensuring is_unlimited column exists...")
-try:
-    cursor.execute('''
-        ALTER TABLE users ADD COLUMN IF NOT EXISTS is_unlimited BOOLEAN DEFAULT FALSE
-    ''')
-except Exception as e:
-    print(f"Note: {e}")
-
-# Create magic_links table
-print("Creating magic_links table...")
-cursor.execute('''
+    );
+    
+    -- Add is_unlimited column if it doesn't exist (for existing databases)
+    ALTER TABLE users ADD COLUMN IF NOT EXISTS is_unlimited BOOLEAN DEFAULT FALSE;
+    
     CREATE TABLE IF NOT EXISTS magic_links (
         id SERIAL PRIMARY KEY,
         user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
         token VARCHAR(255) UNIQUE NOT NULL,
         expires_at TIMESTAMP NOT NULL,
         used_at TIMESTAMP
-    )
-''')
-
-# Create credit_transactions table
-print("Creating credit_transactions table...")
-cursor.execute('''
+    );
+    
     CREATE TABLE IF NOT EXISTS credit_transactions (
         id SERIAL PRIMARY KEY,
         user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
@@ -69,45 +54,64 @@ cursor.execute('''
         search_type VARCHAR(50),
         description TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-''')
-
-# Create password_reset_tokens table
-print("Creating password_reset_tokens table...")
-cursor.execute('''
+    );
+    
     CREATE TABLE IF NOT EXISTS password_reset_tokens (
         id SERIAL PRIMARY KEY,
         user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
         token VARCHAR(255) UNIQUE NOT NULL,
         expires_at TIMESTAMP NOT NULL,
         used_at TIMESTAMP
-    )
-''')
+    );
+    
+    -- email and token lookups use the indexes behind their UNIQUE constraints;
+    -- drop the duplicate plain indexes older versions of this script created
+    DROP INDEX IF EXISTS idx_users_email;
+    DROP INDEX IF EXISTS idx_magic_links_token;
+    DROP INDEX IF EXISTS idx_password_reset_token;
+'''
 
-# Create indexes
-print("Creating indexes...")
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_magic_links_token ON magic_links(token)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_magic_links_user_id ON magic_links(user_id)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_credit_transactions_user_id ON credit_transactions(user_id)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_password_reset_token ON password_reset_tokens(token)')
+INDEX_SQL = [
+    ('idx_magic_links_user_id',
+     'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_magic_links_user_id ON magic_links(user_id)'),
+    ('idx_credit_transactions_user_id',
+     'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_credit_transactions_user_id ON credit_transactions(user_id)'),
+]
 
+print(f"Connecting to database...")
+conn = psycopg2.connect(DATABASE_URL)
+cursor = conn.cursor()
+
+print("Creating users, magic_links, credit_transactions and password_reset_tokens tables...")
+cursor.execute(DDL_SQL)
 conn.commit()
 print('User tables created successfully!')
 
-# Verify tables exist
+# Built CONCURRENTLY so re-running against the live database doesn't block
+# writes; that can't happen inside a transaction, hence after the commit
+print("Creating indexes...")
+conn.autocommit = True
+for index_name, index_sql in INDEX_SQL:
+    # An interrupted concurrent build leaves an INVALID index that IF NOT EXISTS
+    # would skip over, so clear it first
+    drop_invalid_index(cursor, index_name)
+    cursor.execute(index_sql)
+# Fresh statistics so the planner costs the new indexes from the first query
+cursor.execute('ANALYZE users, magic_links, credit_transactions, password_reset_tokens')
+conn.autocommit = False
+
+# Verify tables exist, fetching every table's columns in one query
 tables = ['users', 'magic_links', 'credit_transactions', 'password_reset_tokens']
-for table in tables:
-    cursor.execute(f"""
-        SELECT column_name, data_type 
-        FROM information_schema.columns 
-        WHERE table_name = '{table}'
-        ORDER BY ordinal_position
-    """)
-    columns = cursor.fetchall()
+cursor.execute("""
+    SELECT table_name, column_name, data_type 
+    FROM information_schema.columns 
+    WHERE table_name = ANY(%s)
+    ORDER BY array_position(%s, table_name::text), ordinal_position
+""", (tables, tables))
+for table, columns in itertools.groupby(cursor.fetchall(), key=operator.itemgetter(0)):
     print(f'\n{table} columns:')
     for col in columns:
-        print(f'  - {col[0]}: {col[1]}')
+        print(f'  - {col[1]}: {col[2]}')
 
 conn.close()
 print("\nMigration complete!")
@@ -0,0 +1,192 @@
+"""
+Bulk-load helpers shared by the SQLite to PostgreSQL migration scripts.
+"""
+
+import os
+import sqlite3
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+# Session settings for the one-off migration loads. Skipping the fsync wait on
+# commit is safe here: a crashed run only loses rows that a re-run (which starts
+# by dropping the tables) reloads anyway
+BULK_LOAD_SETTINGS = {
+    'synchronous_commit': 'off',
+    'maintenance_work_mem': os.environ.get('BULK_LOAD_MAINTENANCE_WORK_MEM', '1GB'),
+    'work_mem': '256MB',
+}
+
+PROPERTY_COLUMNS = [
+    'id', 'title_number', 'tenure', 'property_address', 'district', 'county',
+    'region', 'postcode', 'multiple_address_indicator', 'price_paid',
+    'date_proprietor_added', 'additional_proprietor_indicator'
+]
+
+PROPRIETOR_COLUMNS = [
+    'id', 'property_id', 'proprietor_number', 'proprietor_name',
+    'company_registration_no', 'proprietorship_category',
+    'address_line_1', 'address_line_2', 'address_line_3'
+]
+
+# Reader settings for the SQLite source: map the file and keep a 1 GiB page
+# cache so the full-table scans aren't a syscall per page
+SQLITE_SOURCE_PRAGMAS = (
+    "PRAGMA mmap_size = 30000000000",
+    "PRAGMA cache_size = -1048576",
+    "PRAGMA temp_store = MEMORY",
+)
+
+def open_sqlite_source(sqlite_path):
+    """Open the SQLite database being migrated with SQLITE_SOURCE_PRAGMAS applied"""
+    sqlite_conn = sqlite3.connect(sqlite_path)
+    for pragma in SQLITE_SOURCE_PRAGMAS:
+        sqlite_conn.execute(pragma)
+    return sqlite_conn
+
+def connect_for_bulk_load(database_url):
+    """Open a PostgreSQL connection with BULK_LOAD_SETTINGS applied to the session"""
+    pg_conn = psycopg2.connect(database_url)
+    cursor = pg_conn.cursor()
+    for name, value in BULK_LOAD_SETTINGS.items():
+        cursor.execute(f"SET {name} = %s", (value,))
+    pg_conn.commit()
+    return pg_conn
+
+# Columns created as INTEGER (int4) by both migration schemas; everything else is TEXT
+INTEGER_COLUMNS = {'id', 'property_id', 'proprietor_number'}
+
+# COPY BINARY framing: signature, flags and header-extension length, then a -1 field count trailer
+COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_BINARY_TRAILER = struct.pack('>h', -1)
+_NULL_FIELD = struct.pack('>i', -1)
+_pack_int4_field = struct.Struct('>ii').pack
+_pack_length = struct.Struct('>i').pack
+
+def encode_binary_row(row, integer_fields, empty_as_null=False):
+    """
+    Encode one row as a COPY BINARY tuple. None is NULL; empty strings load as
+    zero-length text unless empty_as_null is set (migrate_fast's old CSV behaviour)
+    """
+    parts = [struct.pack('>h', len(row))]
+    for value, is_integer in zip(row, integer_fields):
+        if value is None or (empty_as_null and value == ''):
+            parts.append(_NULL_FIELD)
+        elif is_integer:
+            parts.append(_pack_int4_field(4, int(value)))
+        else:
+            data = str(value).replace('\x00', '').encode('utf-8')
+            parts.append(_pack_length(len(data)))
+            parts.append(data)
+    return b''.join(parts)
+
+class BinaryRowStream:
+    """
+    Read-only file object that encodes rows for COPY ... WITH BINARY on demand,
+    so copy_expert can pull straight from a SQLite cursor without buffering a batch
+    """
+    
+    def __init__(self, rows, columns, total, progress_every=50000, label='', empty_as_null=False):
+        self.rows = iter(rows)
+        self.empty_as_null = empty_as_null
+        self.integer_fields = [column in INTEGER_COLUMNS for column in columns]
+        self.total = total
+        self.progress_every = progress_every
+        self.label = label
+        self.count = 0
+        self._pending = bytearray(COPY_BINARY_HEADER)
+        self._done = False
+    
+    def read(self, size=-1):
+        pending = self._pending
+        while not self._done and (size < 0 or len(pending) < size):
+            row = next(self.rows, None)
+            if row is None:
+                pending += COPY_BINARY_TRAILER
+                self._done = True
+                break
+            pending += encode_binary_row(row, self.integer_fields, self.empty_as_null)
+            self.count += 1
+            if self.count % self.progress_every == 0:
+                print(f"  {self.label}{self.count:,} / {self.total:,} ({self.count * 100 // self.total}%)")
+        
+        if size < 0:
+            size = len(pending)
+        data = bytes(pending[:size])
+        del pending[:size]
+        return data
+
+def copy_table_fast(sqlite_conn, pg_conn, table_name, columns, progress_every=50000, empty_as_null=False):
+    """Copy table using PostgreSQL binary COPY streamed from SQLite"""
+    sqlite_cursor = sqlite_conn.cursor()
+    pg_cursor = pg_conn.cursor()
+    
+    # Get total count
+    sqlite_cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+    total = sqlite_cursor.fetchone()[0]
+    print(f"\nMigrating {table_name}: {total:,} rows")
+    
+    # The cursor yields rows lazily; COPY pulls them through the stream one
+    # buffer-sized chunk at a time and the whole table commits once. Binary
+    # tuples spare both sides the CSV text encode and parse
+    cols_str = ', '.join(columns)
+    sqlite_cursor.execute(f"SELECT {cols_str} FROM {table_name}")
+    stream = BinaryRowStream(sqlite_cursor, columns, total, progress_every, empty_as_null=empty_as_null)
+    pg_cursor.copy_expert(f"COPY {table_name} ({cols_str}) FROM STDIN WITH BINARY", stream)
+    pg_conn.commit()
+    
+    print(f"  Completed: {stream.count:,} rows")
+    return stream.count
+
+def copy_table_parallel(sqlite_path, database_url, table_name, columns, workers=4, progress_every=50000,
+                        empty_as_null=False):
+    """
+    Copy a table over several connections at once, one COPY stream per id % workers
+    partition. Run it before indexes and foreign keys exist so the streams don't contend.
+    """
+    sqlite_conn = open_sqlite_source(sqlite_path)
+    total = sqlite_conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    sqlite_conn.close()
+    print(f"\nMigrating {table_name}: {total:,} rows over {workers} connections")
+    
+    cols_str = ', '.join(columns)
+    
+    def copy_partition(part):
+        # Each worker gets its own SQLite reader and PostgreSQL connection
+        sqlite_conn = open_sqlite_source(sqlite_path)
+        pg_conn = connect_for_bulk_load(database_url)
+        try:
+            sqlite_cursor = sqlite_conn.execute(
+                f"SELECT {cols_str} FROM {table_name} WHERE id % ? = ?", (workers, part)
+            )
+            stream = BinaryRowStream(sqlite_cursor, columns, (total + workers - 1) // workers,
+                                     progress_every, label=f"[{part + 1}/{workers}] ",
+                                     empty_as_null=empty_as_null)
+            pg_conn.cursor().copy_expert(f"COPY {table_name} ({cols_str}) FROM STDIN WITH BINARY", stream)
+            pg_conn.commit()
+            return stream.count
+        finally:
+            pg_conn.close()
+            sqlite_conn.close()
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        count = sum(executor.map(copy_partition, range(workers)))
+    
+    print(f"  Completed: {count:,} rows")
+    return count
+
+def vacuum_analyze(pg_conn, tables):
+    """
+    Gather planner statistics for freshly loaded tables and mark their pages
+    all-visible, so the first queries get real plans and index-only scans
+    """
+    cursor = pg_conn.cursor()
+    # VACUUM cannot run inside a transaction block
+    pg_conn.autocommit = True
+    try:
+        for table in tables:
+            print(f"  - VACUUM (FREEZE, ANALYZE) {table}")
+            cursor.execute(f"VACUUM (FREEZE, ANALYZE) {table}")
+    finally:
+        pg_conn.autocommit = False
@@ -150,10 +150,13 @@ def safe_str(value):
     return str(value).strip()
 
 
+_COMPANY_REG_STRIP = str.maketrans('', '', '() -')
+
+
 def normalize_company_reg(value):
     if not value:
         return ''
-    return value.strip().upper().replace('(', '').replace(')', '').replace(' ', '').replace('-', '')
+    return value.strip().upper().translate(_COMPANY_REG_STRIP)
 
 
 def normalize_upper(value):
@@ -408,8 +411,8 @@ def build_indexes(conn):
         ("idx_stg_company_registration_no", "CREATE INDEX idx_stg_company_registration_no ON proprietors_staging(company_registration_no)"),
         ("idx_stg_proprietor_name", "CREATE INDEX idx_stg_proprietor_name ON proprietors_staging(proprietor_name)"),
         ("idx_stg_proprietor_name_trgm", "CREATE INDEX idx_stg_proprietor_name_trgm ON proprietors_staging USING GIN (proprietor_name_upper gin_trgm_ops)"),
-        ("idx_stg_property_address_trgm", "CREATE INDEX idx_stg_property_address_trgm ON properties_staging USING GIN (property_address_upper gin_trgm_ops)"),
-        ("idx_stg_postcode_trgm", "CREATE INDEX idx_stg_postcode_trgm ON properties_staging USING GIN (postcode_upper gin_trgm_ops)"),
+        ("idx_stg_property_address_left_trgm", "CREATE INDEX idx_stg_property_address_left_trgm ON properties_staging USING GIN (LEFT(property_address_upper, 200) gin_trgm_ops)"),
+        ("idx_stg_postcode_upper", "CREATE INDEX idx_stg_postcode_upper ON properties_staging (postcode_upper text_pattern_ops)"),
     ]
 
     for name, sql in indexes:
@@ -6,10 +6,16 @@ to ensure the optimizations don't change search results.
 Run this AFTER migrate_add_indexes.py to verify data integrity.
 """
 
-import psycopg2
+import csv
+import hashlib
+import io
+import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
-from collections import Counter
 
 # Load environment variables
 load_dotenv()
@@ -17,12 +23,21 @@ load_dotenv('env.local')
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Samples per search type; every sample of a type is compared in one query
+SAMPLE_SIZE = int(os.environ.get('VALIDATION_SAMPLE_SIZE', 10))
+
+# Sample values are reused across runs; pass --refresh to draw new ones
+SAMPLE_CACHE = Path('.validate_cache.json')
+
+
+_COMPANY_REG_STRIP = str.maketrans('', '', '() -')
+
 
 def normalize_company_reg(value):
     """Normalize company registration number - matches main.py logic"""
     if not value:
         return ''
-    return value.strip().upper().replace('(', '').replace(')', '').replace(' ', '').replace('-', '')
+    return value.strip().upper().translate(_COMPANY_REG_STRIP)
 
 
 def normalize_text_upper(value):
@@ -32,226 +47,274 @@ def normalize_text_upper(value):
     return value.strip().upper()
 
 
-def search_old_company_number(conn, company_number):
-    """Old search method using function-based WHERE clause"""
-    cursor = conn.cursor()
-    normalized = normalize_company_reg(company_number)
-    
-    cursor.execute("""
+# Old (function-based) and new (indexed) form of each search, keyed by search type.
+# sample.param is the normalized search value of the row being compared; the text
+# searches wrap it in their LIKE patterns. The new forms use exactly the predicates
+# main.py runs. Only the LIMIT 100 forms are ordered, so both sides keep the same
+# first 100 ids
+SEARCH_QUERIES = {
+    'company_number': ("""
         SELECT 
             p.id,
             p.title_number,
             pr.company_registration_no
         FROM properties p
         INNER JOIN proprietors pr ON p.id = pr.property_id
-        WHERE UPPER(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(pr.company_registration_no), '(', ''), ')', ''), ' ', ''), '-', '')) = %s
-        ORDER BY p.id
-    """, (normalized,))
-    
-    return set(row[0] for row in cursor.fetchall())
-
-
-def search_new_company_number(conn, company_number):
-    """New search method using indexed normalized column"""
-    cursor = conn.cursor()
-    normalized = normalize_company_reg(company_number)
-    
-    cursor.execute("""
+        WHERE UPPER(REPLACE(REPLACE(REPLACE(REPLACE(TRIM(pr.company_registration_no), '(', ''), ')', ''), ' ', ''), '-', '')) = sample.param
+    """, """
         SELECT 
             p.id,
             p.title_number,
             pr.company_registration_no
         FROM properties p
         INNER JOIN proprietors pr ON p.id = pr.property_id
-        WHERE pr.company_reg_normalized = %s
-        ORDER BY p.id
-    """, (normalized,))
-    
-    return set(row[0] for row in cursor.fetchall())
-
-
-def search_old_company_name(conn, company_name):
-    """Old search method using function-based WHERE clause"""
-    cursor = conn.cursor()
-    normalized = normalize_text_upper(company_name)
-    
-    cursor.execute("""
+        WHERE pr.company_reg_normalized = sample.param
+    """),
+    'company_name': ("""
         SELECT 
             p.id,
             pr.proprietor_name
         FROM properties p
         INNER JOIN proprietors pr ON p.id = pr.property_id
-        WHERE UPPER(TRIM(pr.proprietor_name)) LIKE %s
+        WHERE UPPER(TRIM(pr.proprietor_name)) LIKE '%%' || sample.param || '%%'
         ORDER BY p.id
         LIMIT 100
-    """, (f'%{normalized}%',))
-    
-    return set(row[0] for row in cursor.fetchall())
-
-
-def search_new_company_name(conn, company_name):
-    """New search method using indexed normalized column"""
-    cursor = conn.cursor()
-    normalized = normalize_text_upper(company_name)
-    
-    cursor.execute("""
+    """, """
         SELECT 
             p.id,
             pr.proprietor_name
         FROM properties p
         INNER JOIN proprietors pr ON p.id = pr.property_id
-        WHERE pr.proprietor_name_upper LIKE %s
+        WHERE pr.proprietor_name_upper LIKE '%%' || sample.param || '%%'
         ORDER BY p.id
         LIMIT 100
-    """, (f'%{normalized}%',))
-    
-    return set(row[0] for row in cursor.fetchall())
-
-
-def search_old_address(conn, address):
-    """Old search method using function-based WHERE clause"""
-    cursor = conn.cursor()
-    normalized = normalize_text_upper(address)
-    
-    cursor.execute("""
+    """),
+    'address': ("""
         SELECT 
             p.id,
             p.property_address
         FROM properties p
         INNER JOIN proprietors pr ON p.id = pr.property_id
-        WHERE UPPER(TRIM(p.property_address)) LIKE %s
-           OR UPPER(TRIM(p.postcode)) LIKE %s
+        WHERE UPPER(TRIM(p.property_address)) LIKE '%%' || sample.param || '%%'
+           OR UPPER(TRIM(p.postcode)) LIKE '%%' || sample.param || '%%'
         ORDER BY p.id
         LIMIT 100
-    """, (f'%{normalized}%', f'%{normalized}%'))
-    
-    return set(row[0] for row in cursor.fetchall())
-
-
-def search_new_address(conn, address):
-    """New search method using indexed normalized columns"""
-    cursor = conn.cursor()
-    normalized = normalize_text_upper(address)
-    
-    cursor.execute("""
+    """, """
         SELECT 
             p.id,
             p.property_address
         FROM properties p
         INNER JOIN proprietors pr ON p.id = pr.property_id
-        WHERE p.property_address_upper LIKE %s
-           OR p.postcode_upper LIKE %s
+        WHERE LEFT(p.property_address_upper, 200) LIKE '%%' || sample.param || '%%'
+           OR p.postcode_upper LIKE sample.param || '%%'
         ORDER BY p.id
         LIMIT 100
-    """, (f'%{normalized}%', f'%{normalized}%'))
-    
-    return set(row[0] for row in cursor.fetchall())
+    """),
+}
+
+# Both forms run server-side for every sample in one statement, and only the
+# set arithmetic comes back: five integers per sample instead of two id lists.
+# Each side is reduced to a count and an md5 of its sorted distinct ids in one
+# pass; the INTERSECT/EXCEPT counts only run (CASE evaluates lazily) when the
+# checksums differ, so the happy path never diffs the result sets
+COMPARE_SQL = """
+    SELECT counts.*
+    FROM unnest(%s::text[]) WITH ORDINALITY AS sample(param, ord)
+    CROSS JOIN LATERAL (
+        WITH old AS ({old}), new AS ({new}),
+        sums AS (
+            SELECT *
+            FROM (SELECT COUNT(DISTINCT id) AS old_count,
+                         md5(string_agg(DISTINCT id::text, ',' ORDER BY id::text)) AS old_hash
+                  FROM old) old_sum,
+                 (SELECT COUNT(DISTINCT id) AS new_count,
+                         md5(string_agg(DISTINCT id::text, ',' ORDER BY id::text)) AS new_hash
+                  FROM new) new_sum
+        )
+        SELECT
+            old_count,
+            new_count,
+            CASE WHEN old_hash IS NOT DISTINCT FROM new_hash THEN old_count
+                 ELSE (SELECT COUNT(*) FROM (SELECT id FROM old INTERSECT SELECT id FROM new) common) END,
+            CASE WHEN old_hash IS NOT DISTINCT FROM new_hash THEN 0
+                 ELSE (SELECT COUNT(*) FROM (SELECT id FROM old EXCEPT SELECT id FROM new) only_old) END,
+            CASE WHEN old_hash IS NOT DISTINCT FROM new_hash THEN 0
+                 ELSE (SELECT COUNT(*) FROM (SELECT id FROM new EXCEPT SELECT id FROM old) only_new) END
+        FROM sums
+    ) counts
+    ORDER BY sample.ord
+"""
+
 
+def search_param(search_type, value):
+    """Bind parameter for one sample value, normalized the way main.py does"""
+    if search_type == 'company_number':
+        return normalize_company_reg(value)
+    return normalize_text_upper(value)
 
-def get_sample_company_numbers(conn, limit=20):
+
+def compare_searches(cursor, search_type, search_values, label_width, log=print):
+    """
+    Run the old and new form of a search for all sample values in a single
+    round trip and report the differences for each one
+    """
+    old_sql, new_sql = SEARCH_QUERIES[search_type]
+    params = [search_param(search_type, value) for value in search_values]
+    cursor.execute(COMPARE_SQL.format(old=old_sql, new=new_sql), (params,))
+    
+    all_match = True
+    for i, (search_value, counts) in enumerate(zip(search_values, cursor.fetchall()), 1):
+        log(f"  Test {i}/{len(search_values)}: {search_value[:label_width]}...")
+        if not compare_results(*counts, search_type, search_value, log=log):
+            all_match = False
+    return all_match
+
+
+def copy_column(conn, sql, limit):
+    """
+    Fetch a single-column sample with COPY ... TO STDOUT, which streams the
+    rows in one response rather than through the row-by-row fetch protocol
+    """
+    buffer = io.StringIO()
+    with conn.cursor() as cursor:
+        query = cursor.mogrify(sql, (limit,)).decode()
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH CSV", buffer)
+    buffer.seek(0)
+    return [row[0] for row in csv.reader(buffer)]
+
+
+def get_sample_company_numbers(conn, limit=SAMPLE_SIZE):
     """Get sample company numbers from database for testing"""
-    cursor = conn.cursor()
-    cursor.execute("""
+    return copy_column(conn, """
         SELECT DISTINCT company_registration_no 
         FROM proprietors 
         WHERE company_registration_no IS NOT NULL 
         AND TRIM(company_registration_no) != ''
         LIMIT %s
-    """, (limit,))
-    return [row[0] for row in cursor.fetchall()]
+    """, limit)
 
 
-def get_sample_company_names(conn, limit=20):
+def get_sample_company_names(conn, limit=SAMPLE_SIZE):
     """Get sample company names from database for testing"""
-    cursor = conn.cursor()
-    cursor.execute("""
+    return copy_column(conn, """
         SELECT DISTINCT proprietor_name 
         FROM proprietors 
         WHERE proprietor_name IS NOT NULL 
         AND TRIM(proprietor_name) != ''
         LIMIT %s
-    """, (limit,))
-    return [row[0] for row in cursor.fetchall()]
+    """, limit)
 
 
-def get_sample_addresses(conn, limit=20):
+def get_sample_addresses(conn, limit=SAMPLE_SIZE):
     """Get sample addresses from database for testing"""
-    cursor = conn.cursor()
-    cursor.execute("""
+    return copy_column(conn, """
         SELECT DISTINCT property_address 
         FROM properties 
         WHERE property_address IS NOT NULL 
         AND TRIM(property_address) != ''
         LIMIT %s
-    """, (limit,))
-    return [row[0] for row in cursor.fetchall()]
+    """, limit)
 
 
-def compare_results(old_results, new_results, search_type, search_value):
-    """Compare two result sets and report differences"""
-    old_set = set(old_results)
-    new_set = set(new_results)
-    
-    only_old = old_set - new_set
-    only_new = new_set - old_set
-    common = old_set & new_set
-    
-    match = len(only_old) == 0 and len(only_new) == 0
+def compare_results(old_count, new_count, common, only_old, only_new, search_type, search_value, log=print):
+    """Report the differences between two result sets from their counts"""
+    match = only_old == 0 and only_new == 0
     
     if not match:
-        print(f"\n  ⚠ MISMATCH for {search_type}: '{search_value}'")
-        print(f"    Old results: {len(old_set)}, New results: {len(new_set)}, Common: {len(common)}")
+        log(f"\n  ⚠ MISMATCH for {search_type}: '{search_value}'")
+        log(f"    Old results: {old_count}, New results: {new_count}, Common: {common}")
         if only_old:
-            print(f"    Only in old: {len(only_old)} results")
+            log(f"    Only in old: {only_old} results")
         if only_new:
-            print(f"    Only in new: {len(only_new)} results")
+            log(f"    Only in new: {only_new} results")
     else:
-        print(f"  ✓ Match: {len(common)} results")
+        log(f"  ✓ Match: {common} results")
     
     return match
 
 
+# (heading, search type, sampler, label width) for each independent phase
+VALIDATION_PHASES = (
+    ("Testing company number searches...", "company_number", get_sample_company_numbers, 20),
+    ("Testing company name searches...", "company_name", get_sample_company_names, 30),
+    ("Testing address searches...", "address", get_sample_addresses, 30),
+)
+
+
+def sample_cache_key():
+    """Cached samples are only valid for the same database and sample size"""
+    return [hashlib.sha256(DATABASE_URL.encode()).hexdigest(), SAMPLE_SIZE]
+
+
+def load_cached_samples():
+    """Sample values from a previous run, keyed by search type, or {}"""
+    try:
+        cached = json.loads(SAMPLE_CACHE.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cached, dict) or cached.get('key') != sample_cache_key():
+        return {}
+    return cached.get('samples', {})
+
+
+def save_cached_samples(samples):
+    try:
+        SAMPLE_CACHE.write_text(json.dumps({'key': sample_cache_key(), 'samples': samples}))
+    except OSError as e:
+        print(f"Warning: could not write sample cache: {e}")
+
+
+def run_phase(pool, heading, search_type, sampler, label_width, values=None):
+    """
+    Sample and compare one search type on its own pooled connection. Output
+    is buffered so concurrent phases still print as contiguous blocks
+    """
+    lines = [heading]
+    conn = pool.getconn()
+    try:
+        if values is None:
+            values = sampler(conn)
+        with conn.cursor() as cursor:
+            match = compare_searches(cursor, search_type, values, label_width, log=lines.append)
+    finally:
+        pool.putconn(conn)
+    return match, lines, values
+
+
 def main():
     if not DATABASE_URL:
         print("Error: DATABASE_URL not set. Please check your env.local file.")
         return
     
+    samples = {} if '--refresh' in sys.argv[1:] else load_cached_samples()
+    if samples:
+        print(f"Using cached sample values from {SAMPLE_CACHE} (pass --refresh to resample)")
+    
     print("Connecting to PostgreSQL...")
-    conn = psycopg2.connect(DATABASE_URL)
+    pool = ThreadedConnectionPool(len(VALIDATION_PHASES), len(VALIDATION_PHASES), DATABASE_URL)
     
     try:
         print("\n=== Validation: Comparing Old vs New Search Methods ===\n")
         
-        all_match = True
-        
-        # Test company number searches
-        print("Testing company number searches...")
-        company_numbers = get_sample_company_numbers(conn, 20)
-        for i, company_num in enumerate(company_numbers[:10], 1):  # Test first 10
-            print(f"  Test {i}/10: {company_num[:20]}...")
-            old_results = search_old_company_number(conn, company_num)
-            new_results = search_new_company_number(conn, company_num)
-            if not compare_results(old_results, new_results, "company_number", company_num):
-                all_match = False
+        # The phases are independent and each waits on Postgres, so run them
+        # side by side and report them in order once they finish
+        with ThreadPoolExecutor(max_workers=len(VALIDATION_PHASES)) as executor:
+            futures = [
+                executor.submit(run_phase, pool, *phase, values=samples.get(phase[1]))
+                for phase in VALIDATION_PHASES
+            ]
+            results = [future.result() for future in futures]
         
-        # Test company name searches
-        print("\nTesting company name searches...")
-        company_names = get_sample_company_names(conn, 20)
-        for i, company_name in enumerate(company_names[:10], 1):  # Test first 10
-            print(f"  Test {i}/10: {company_name[:30]}...")
-            old_results = search_old_company_name(conn, company_name)
-            new_results = search_new_company_name(conn, company_name)
-            if not compare_results(old_results, new_results, "company_name", company_name):
-                all_match = False
+        fresh_samples = {phase[1]: values for phase, (_, _, values) in zip(VALIDATION_PHASES, results)}
+        if fresh_samples != samples:
+            save_cached_samples(fresh_samples)
         
-        # Test address searches
-        print("\nTesting address searches...")
-        addresses = get_sample_addresses(conn, 20)
-        for i, address in enumerate(addresses[:10], 1):  # Test first 10
-            print(f"  Test {i}/10: {address[:30]}...")
-            old_results = search_old_address(conn, address)
-            new_results = search_new_address(conn, address)
-            if not compare_results(old_results, new_results, "address", address):
+        all_match = True
+        for i, (match, lines, _) in enumerate(results):
+            if i:
+                print()
+            print("\n".join(lines))
+            if not match:
                 all_match = False
         
         # Summary
@@ -272,7 +335,7 @@ def main():
         traceback.print_exc()
         raise
     finally:
-        conn.close()
+        pool.closeall()
 
 
 if __name__ == '__main__':
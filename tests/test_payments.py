@@ -0,0 +1,120 @@
+"""Tests for Stripe checkout session replay protection in app/main.py."""
+
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+from app import main  # noqa: E402
+
+
+def paid_session(search_type="name", search_value="Acme"):
+    return SimpleNamespace(
+        payment_status="paid",
+        metadata={"search_type": search_type, "search_value": search_value},
+    )
+
+
+class TestVerifyStripePayment(unittest.TestCase):
+    def setUp(self):
+        main.used_sessions.clear()
+        main._stripe_session_cache.clear()
+
+    def tearDown(self):
+        main.used_sessions.clear()
+        main._stripe_session_cache.clear()
+
+    @patch("app.main.claim_payment", return_value=True)
+    @patch("stripe.checkout.Session.retrieve")
+    def test_second_use_is_rejected_without_stripe_call(self, mock_retrieve, mock_claim):
+        mock_retrieve.return_value = paid_session()
+
+        first = main.verify_stripe_payment("cs_test_1", "name", "acme")
+        second = main.verify_stripe_payment("cs_test_1", "name", "acme")
+
+        self.assertEqual(first, (True, None))
+        self.assertFalse(second[0])
+        mock_retrieve.assert_called_once()
+        mock_claim.assert_called_once_with("cs_test_1", "name", "Acme", main.SEARCH_PRICES["name"])
+
+    @patch("app.main.claim_payment", return_value=False)
+    @patch("stripe.checkout.Session.retrieve")
+    def test_session_claimed_by_another_instance_is_rejected(self, mock_retrieve, _mock_claim):
+        mock_retrieve.return_value = paid_session()
+
+        is_valid, error = main.verify_stripe_payment("cs_test_2", "name", "acme")
+
+        self.assertFalse(is_valid)
+        self.assertIn("already been used", error)
+
+    @patch("app.main.claim_payment", return_value=True)
+    @patch("stripe.checkout.Session.retrieve")
+    def test_paid_session_is_retrieved_once_across_retries(self, mock_retrieve, _mock_claim):
+        mock_retrieve.return_value = paid_session(search_value="Acme")
+
+        mismatch = main.verify_stripe_payment("cs_test_3", "name", "Acne")
+        retry = main.verify_stripe_payment("cs_test_3", "name", "Acme")
+
+        self.assertIn("different search query", mismatch[1])
+        self.assertEqual(retry, (True, None))
+        mock_retrieve.assert_called_once()
+
+    def test_used_sessions_are_bounded(self):
+        with patch.object(main, "USED_SESSIONS_MAX", 3):
+            for i in range(5):
+                main.mark_session_used(f"cs_{i}")
+
+        self.assertEqual(list(main.used_sessions), ["cs_2", "cs_3", "cs_4"])
+        self.assertFalse(main.is_session_marked_used("cs_0"))
+
+
+class TestPagedSearchCharging(unittest.TestCase):
+    """Only the first page of a search is charged; later pages reuse the session's record."""
+
+    def search(self, client, page, **extra):
+        return client.post("/api/search", json={
+            "search_type": "number", "search_value": "01234567", "page": page, "page_size": 10, **extra,
+        }).get_json()
+
+    @patch("app.main.cached_search", return_value=[])
+    @patch("app.main.deduct_credits", return_value=4)
+    @patch("app.main.get_current_user")
+    def test_credit_user_is_charged_once_across_pages(self, mock_user, mock_deduct, _mock_search):
+        mock_user.return_value = {"id": 1, "credits": 5, "is_unlimited": False}
+        client = main.app.test_client()
+
+        first = self.search(client, 1)
+        second = self.search(client, 2)
+
+        self.assertTrue(first["success"])
+        self.assertTrue(second["success"])
+        mock_deduct.assert_called_once()
+
+    @patch("app.main.cached_search", return_value=[])
+    @patch("app.main.verify_stripe_payment", return_value=(True, None))
+    @patch("app.main.stripe_configured", return_value=True)
+    @patch("app.main.get_current_user", return_value=None)
+    def test_stripe_session_covers_later_pages(self, _mock_user, _mock_configured, mock_verify, _mock_search):
+        client = main.app.test_client()
+
+        self.search(client, 1, session_id="cs_test_page")
+        second = self.search(client, 2, session_id="cs_test_page")
+
+        self.assertTrue(second["success"])
+        mock_verify.assert_called_once_with("cs_test_page", "number", "01234567")
+
+    @patch("app.main.cached_search", return_value=[])
+    @patch("app.main.verify_stripe_payment", return_value=(False, "Payment required."))
+    @patch("app.main.stripe_configured", return_value=True)
+    @patch("app.main.get_current_user", return_value=None)
+    def test_later_page_of_unpaid_search_still_requires_payment(self, *_mocks):
+        response = self.search(main.app.test_client(), 2)
+
+        self.assertFalse(response["success"])
+        self.assertTrue(response["payment_required"])
+
+
+if __name__ == "__main__":
+    unittest.main()
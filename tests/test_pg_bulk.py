@@ -0,0 +1,46 @@
+"""Tests for the COPY BINARY encoding in pg_bulk.py."""
+
+import os
+import struct
+import sys
+import unittest
+
+# Make the scripts directory importable
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pg_bulk  # noqa: E402
+
+
+def decode_binary_row(data):
+    """Split an encoded tuple back into its fields; NULL fields come back as None"""
+    (field_count,) = struct.unpack_from('>h', data)
+    offset, fields = 2, []
+    for _ in range(field_count):
+        (length,) = struct.unpack_from('>i', data, offset)
+        offset += 4
+        if length == -1:
+            fields.append(None)
+        else:
+            fields.append(data[offset:offset + length])
+            offset += length
+    return fields
+
+
+class TestEncodeBinaryRow(unittest.TestCase):
+    def test_empty_string_and_none_round_trip(self):
+        row = (7, '', None, 'TITLE1')
+
+        fields = decode_binary_row(pg_bulk.encode_binary_row(row, [True, False, False, False]))
+
+        self.assertEqual(fields, [struct.pack('>i', 7), b'', None, b'TITLE1'])
+
+    def test_empty_as_null_loads_empty_strings_as_null(self):
+        row = ('', None, 'X')
+
+        fields = decode_binary_row(pg_bulk.encode_binary_row(row, [False] * 3, empty_as_null=True))
+
+        self.assertEqual(fields, [None, None, b'X'])
+
+
+if __name__ == "__main__":
+    unittest.main()
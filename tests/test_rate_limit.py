@@ -0,0 +1,51 @@
+"""Tests for the in-process rate limiter in app/main.py."""
+
+import os
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+from app import main  # noqa: E402
+
+
+class TestRateLimit(unittest.TestCase):
+    def setUp(self):
+        main._rate_limit_buckets.clear()
+
+    def tearDown(self):
+        main._rate_limit_buckets.clear()
+
+    def test_burst_beyond_capacity_is_rejected(self):
+        waits = [main.take_rate_limit_token("ip:1.2.3.4", 3, 0.05) for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertGreater(waits[3], 0)
+
+    def test_callers_have_separate_buckets(self):
+        main.take_rate_limit_token("ip:1.2.3.4", 1, 0.05)
+
+        self.assertEqual(main.take_rate_limit_token("ip:5.6.7.8", 1, 0.05), 0)
+
+    def test_route_returns_429_with_retry_after(self):
+        client = main.app.test_client()
+        with patch.object(main, "RATE_LIMIT_REQUESTS", 1):
+            client.post("/api/search/directors", json={"director_name": ""})
+            response = client.post("/api/search/directors", json={"director_name": ""})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response.headers)
+
+
+    def test_forwarded_for_is_only_trusted_on_vercel(self):
+        headers = {"X-Forwarded-For": "9.9.9.9, 10.0.0.1"}
+        environ = {"REMOTE_ADDR": "127.0.0.1"}
+
+        with main.app.test_request_context(headers=headers, environ_base=environ):
+            self.assertEqual(main.rate_limit_key(), "ip:127.0.0.1")
+            with patch.object(main, "_on_vercel", True):
+                self.assertEqual(main.rate_limit_key(), "ip:9.9.9.9")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,353 @@
+"""Tests for search helpers in app/main.py that don't need a live database."""
+
+import json
+import os
+import sqlite3
+import unittest
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app import main  # noqa: E402
+
+
+class TestCompanyNamesCache(unittest.TestCase):
+    """The distinct-names list should be fetched once per TTL window."""
+
+    def setUp(self):
+        main._company_names_cache.update({'snapshot': main.CompanyNamesSnapshot((), (), (), ()), 'expires': 0})
+
+    def tearDown(self):
+        main._company_names_cache.update({'snapshot': main.CompanyNamesSnapshot((), (), (), ()), 'expires': 0})
+
+    @patch('app.main._fetch_unique_company_names')
+    def test_names_are_fetched_once_within_ttl(self, mock_fetch):
+        mock_fetch.return_value = ['ACME LIMITED', 'TESCO PLC']
+
+        first = main.get_all_unique_company_names()
+        second = main.get_all_unique_company_names()
+
+        self.assertEqual(first, ('ACME LIMITED', 'TESCO PLC'))
+        self.assertIs(first, second)
+        mock_fetch.assert_called_once()
+
+    @patch('app.main._fetch_unique_company_names')
+    def test_expired_cache_is_refetched(self, mock_fetch):
+        mock_fetch.side_effect = [['ACME LIMITED'], ['ACME LIMITED', 'NEW CO LTD']]
+
+        main.get_all_unique_company_names()
+        main._company_names_cache['expires'] = 0
+        names = main.get_all_unique_company_names()
+
+        self.assertEqual(names, ('ACME LIMITED', 'NEW CO LTD'))
+        self.assertEqual(mock_fetch.call_count, 2)
+
+    @patch('app.main._fetch_unique_company_names')
+    def test_finished_reload_invalidates_cache(self, mock_fetch):
+        mock_fetch.side_effect = [['ACME LIMITED'], ['ACME LIMITED', 'NEW CO LTD']]
+        main.get_all_unique_company_names()
+        job = {'process': MagicMock(**{'poll.return_value': 0}), 'log_path': '/nonexistent.log'}
+
+        with patch.dict(main._reload_jobs, {'job1': job}):
+            response = main.app.test_client().get('/api/reload/status/job1')
+
+        self.assertEqual(response.get_json()['status'], 'succeeded')
+        self.assertEqual(main.get_all_unique_company_names(), ('ACME LIMITED', 'NEW CO LTD'))
+
+    @patch('app.main._fetch_unique_company_names')
+    def test_suggestions_return_original_names_regardless_of_case(self, mock_fetch):
+        mock_fetch.return_value = ['Acme Holdings Limited', 'TESCO STORES LIMITED']
+
+        matches = main.suggest_company_names('tesco stores', 70)
+
+        self.assertEqual(matches[0][0], 'TESCO STORES LIMITED')
+        self.assertTrue(all(score >= 70 for _, score in matches))
+
+    @patch('app.main._fetch_unique_company_names')
+    def test_refresh_publishes_one_consistent_snapshot(self, mock_fetch):
+        mock_fetch.side_effect = [['ACME LIMITED'], ['ZED LTD', 'ACME LIMITED', 'BETA PLC']]
+        old = main.company_names_snapshot()
+
+        main._company_names_cache['expires'] = 0
+        new = main.company_names_snapshot()
+
+        self.assertEqual(old.names, ('ACME LIMITED',))
+        self.assertEqual(len(old.prefix_indexes), 1)
+        self.assertEqual([new.processed[i] for i in new.prefix_indexes], list(new.prefix_keys))
+
+    @patch('app.main.process.extract')
+    @patch('app.main._fetch_unique_company_names')
+    def test_truncated_name_is_served_by_prefix_lookup(self, mock_fetch, mock_extract):
+        mock_fetch.return_value = ['TESCO STORES LIMITED', 'TESCO PLC', 'ACME LIMITED']
+
+        matches = main.suggest_company_names('Tesco Stor', 70)
+
+        self.assertEqual([name for name, _ in matches], ['TESCO STORES LIMITED'])
+        mock_extract.assert_not_called()
+
+
+class TestReloadJobs(unittest.TestCase):
+    @patch('app.main.invalidate_search_caches')
+    def test_caches_are_invalidated_when_reload_exits(self, mock_invalidate):
+        job = {'process': MagicMock(**{'wait.return_value': 0, 'poll.return_value': 0}), 'log_path': MagicMock()}
+
+        main._watch_reload(job)
+        main._invalidate_after_reload(job)
+
+        mock_invalidate.assert_called_once()
+        self.assertTrue(job['caches_invalidated'])
+
+    @patch('app.main.invalidate_search_caches')
+    @patch('app.main.DATABASE_URL', None)
+    @patch('subprocess.Popen')
+    def test_new_reload_drops_finished_jobs(self, mock_popen, mock_invalidate):
+        finished = {'process': MagicMock(**{'poll.return_value': 0}), 'log_path': MagicMock()}
+
+        with patch.dict(main._reload_jobs, {'old': finished}, clear=True):
+            response = main.app.test_client().post('/api/reload')
+            job_ids = list(main._reload_jobs)
+            for job in main._reload_jobs.values():
+                job['log_path'].unlink(missing_ok=True)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(job_ids, [response.get_json()['job_id']])
+        finished['log_path'].unlink.assert_called_once_with(missing_ok=True)
+        # The dropped job succeeded without anyone polling it, so caches go first
+        mock_invalidate.assert_called_once()
+
+
+class TestSqliteSchemaUpgrade(unittest.TestCase):
+    def test_old_database_gets_backfilled_normalized_column(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE proprietors (id INTEGER PRIMARY KEY, company_registration_no TEXT)")
+        conn.executemany("INSERT INTO proprietors (company_registration_no) VALUES (?)", [(' sc(012)-345 ',), (None,)])
+
+        with patch.object(main, '_sqlite_schema_checked', False):
+            main.ensure_sqlite_schema(conn)
+
+        rows = conn.execute("SELECT company_reg_normalized FROM proprietors ORDER BY id").fetchall()
+        self.assertEqual(rows, [('SC012345',), ('',)])
+
+
+class TestTrigramSuggestions(unittest.TestCase):
+    @patch('app.main.DATABASE_URL', 'postgresql://example')
+    @patch('app.main._fetch_unique_company_names')
+    @patch('app.main._trigram_name_candidates')
+    def test_postgres_reranks_index_candidates(self, mock_candidates, mock_fetch):
+        mock_candidates.return_value = ['TESCO PLC', 'TESCO STORES LIMITED', 'TESLA LTD']
+
+        matches = main.suggest_company_names('tesco stores', 70)
+
+        self.assertEqual(matches[0][0], 'TESCO STORES LIMITED')
+        mock_fetch.assert_not_called()
+
+
+class TestCachedSearch(unittest.TestCase):
+    def setUp(self):
+        main._search_cache.clear()
+
+    def tearDown(self):
+        main._search_cache.clear()
+
+    def test_repeat_search_is_served_from_cache(self):
+        calls = []
+
+        def search(value):
+            calls.append(value)
+            return [{'title_number': 'AB1'}]
+
+        first = main.cached_search('name', 'Tesco PLC', search)
+        second = main.cached_search('name', 'TESCO plc', search)
+
+        self.assertIs(first, second)
+        self.assertEqual(calls, ['Tesco PLC'])
+
+    def test_expired_entry_is_recomputed(self):
+        calls = []
+
+        def search(value):
+            calls.append(value)
+            return []
+
+        with patch.object(main, 'SEARCH_CACHE_TTL', 0):
+            main.cached_search('address', 'SW1', search)
+            main.cached_search('address', 'SW1', search)
+
+        self.assertEqual(len(calls), 2)
+
+
+class TestCompaniesHouseCache(unittest.TestCase):
+    def setUp(self):
+        main._companies_house_cache.clear()
+        main._rate_limit_buckets.clear()
+
+    def tearDown(self):
+        main._companies_house_cache.clear()
+
+    @patch('app.main.COMPANIES_HOUSE_API_KEY', 'test-key')
+    @patch('app.main._ch_session.get')
+    def test_successful_appointments_are_reused(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'items': [{'appointed_to': {'company_number': '01234567', 'company_name': 'ACME LIMITED'}}]
+        }
+
+        first = main.get_officer_appointments('/officers/abc/appointments')
+        second = main.get_officer_appointments('/officers/abc/appointments')
+
+        self.assertEqual(first[0]['company_number'], '01234567')
+        self.assertIs(first, second)
+        mock_get.assert_called_once()
+
+    @patch('app.main.COMPANIES_HOUSE_API_KEY', 'test-key')
+    @patch('app.main._ch_session.get')
+    def test_failed_responses_are_not_cached(self, mock_get):
+        mock_get.return_value.status_code = 500
+
+        main.get_officer_appointments('/officers/abc/appointments')
+        main.get_officer_appointments('/officers/abc/appointments')
+
+        self.assertEqual(mock_get.call_count, 2)
+
+
+class TestCopyCsvExport(unittest.TestCase):
+    """PostgreSQL CSV exports come straight from COPY ... TO STDOUT WITH CSV."""
+
+    def setUp(self):
+        main._rate_limit_buckets.clear()
+
+    def export(self, copy_output):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.mogrify.side_effect = lambda sql, params: sql.encode()
+        cursor.copy_expert.side_effect = lambda sql, spool: spool.write(copy_output)
+        with patch('app.main.DATABASE_URL', 'postgresql://example'), \
+                patch('app.main.get_db_connection', return_value=conn), \
+                patch('app.main.release_db_connection'):
+            response = main.app.test_client().post(
+                '/api/export/csv', json={'search_type': 'name', 'search_value': 'Acme'}
+            )
+            return response, cursor
+
+    def test_copy_output_follows_header(self):
+        response, cursor = self.export(b'AB1,Freehold,1 HIGH STREET\n')
+
+        self.assertEqual(response.status_code, 200)
+        header, body = response.get_data().split(b'\n', 1)
+        self.assertEqual(header.decode().split(','), list(main.EXPORT_FIELDNAMES))
+        self.assertEqual(body, b'AB1,Freehold,1 HIGH STREET\n')
+        copy_sql = cursor.copy_expert.call_args[0][0]
+        self.assertTrue(copy_sql.startswith(b'COPY (SELECT title_number, tenure'))
+        self.assertTrue(copy_sql.endswith(b'TO STDOUT WITH CSV'))
+
+    def test_recent_search_is_exported_from_cache(self):
+        row = dict.fromkeys(main.EXPORT_FIELDNAMES, '')
+        row['title_number'] = 'AB1'
+        main._search_cache.set(('name', 'acme', (('limit', None), ('offset', 0))), ([row], []), 60)
+        try:
+            response, cursor = self.export(b'')
+        finally:
+            main._search_cache.clear()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data().split(b'\n')[1], b'AB1,,,,,,,,,,,')
+        cursor.copy_expert.assert_not_called()
+
+    def test_empty_copy_is_rejected(self):
+        response, _ = self.export(b'')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'No results to export')
+
+
+class TestCompaniesHouseRateLimit(unittest.TestCase):
+    def setUp(self):
+        main._companies_house_cache.clear()
+        main._rate_limit_buckets.clear()
+
+    def tearDown(self):
+        main._companies_house_cache.clear()
+        main._rate_limit_buckets.clear()
+
+    @patch('app.main.CH_RATE_LIMIT_REQUESTS', 1)
+    @patch('app.main.COMPANIES_HOUSE_API_KEY', 'test-key')
+    @patch('app.main._ch_session.get')
+    def test_calls_beyond_the_key_budget_are_not_sent(self, mock_get):
+        mock_get.return_value.status_code = 500
+
+        main.get_officer_appointments('/officers/abc/appointments')
+        officers, error = main.search_directors_from_companies_house('John Smith')
+
+        mock_get.assert_called_once()
+        self.assertEqual(officers, [])
+        self.assertIn('Rate limit', error)
+
+
+class TestSearchValueValidation(unittest.TestCase):
+    def test_short_partial_searches_are_rejected(self):
+        self.assertIsNone(main.search_value_error('name', 'Tes'))
+        self.assertIn('at least 2', main.search_value_error('address', 'W'))
+        self.assertIsNone(main.search_value_error('address', 'W1'))
+        self.assertIsNone(main.search_value_error('number', '12'))
+        self.assertEqual(main.search_value_error('name', ''), 'Search value is required')
+
+    def test_outward_code_only_searches_postcode_prefix(self):
+        for database_url in ('postgresql://example', None):
+            with patch('app.main.DATABASE_URL', database_url):
+                sql, params = main.address_search_query('w1')
+
+            self.assertEqual(params[0], 'W1%')
+            self.assertNotIn('property_address_upper', sql)
+            self.assertNotIn('UPPER(TRIM(p.property_address))', sql)
+
+    @patch('app.main.get_current_user')
+    def test_short_search_is_rejected_before_credits_are_used(self, mock_user):
+        response = main.app.test_client().post('/api/search', json={'search_type': 'name', 'search_value': 'a'})
+
+        self.assertFalse(response.get_json()['success'])
+        mock_user.assert_not_called()
+
+
+class TestOrjsonProvider(unittest.TestCase):
+    def test_jsonify_output_matches_default_provider(self):
+        payload = {'date_proprietor_added': date(2020, 1, 2), 'price_paid': Decimal('125000.00'), 'tenure': 'Freehold'}
+
+        with main.app.app_context():
+            body = main.jsonify(payload).get_data()
+
+        self.assertEqual(main.orjson.loads(body), json.loads(DefaultJSONProvider(main.app).dumps(payload)))
+
+
+class TestCurrentUserETag(unittest.TestCase):
+    @patch('app.main.get_current_user')
+    def test_unchanged_user_revalidates_with_304(self, mock_user):
+        mock_user.return_value = {'email': 'a@example.com', 'credits': 5, 'email_verified': True}
+        client = main.app.test_client()
+
+        first = client.get('/api/auth/me')
+        repeat = client.get('/api/auth/me', headers={'If-None-Match': first.headers['ETag']})
+        mock_user.return_value = dict(mock_user.return_value, credits=4)
+        changed = client.get('/api/auth/me', headers={'If-None-Match': first.headers['ETag']})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.get_data(), b'')
+        self.assertEqual(changed.get_json()['user']['credits'], 4)
+
+
+class TestIsCorporateOfficer(unittest.TestCase):
+    def test_company_names_are_flagged(self):
+        for name in ('ACME HOLDINGS LIMITED', 'Smith & Co', 'jones trustees', 'ACME CO. NOMINEES', 'Widgets Inc.'):
+            self.assertTrue(main.is_corporate_officer(name), name)
+
+    def test_individuals_are_not_flagged(self):
+        for name in ('SMITH, John Robert', 'Mary ANNE', 'VINCENT, Paul', 'LINCOLN, Amy', 'CORPE, Jo', '', None):
+            self.assertFalse(main.is_corporate_officer(name), name)
+
+
+if __name__ == "__main__":
+    unittest.main()
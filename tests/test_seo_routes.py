@@ -102,6 +102,14 @@ class TestSeoRoutes(unittest.TestCase):
         self.assertIn("Last updated", body)
         self.assertIn("Search company ownership data", body)
 
+    def test_anonymous_pages_are_edge_cacheable(self):
+        for path in ("/", "/search", "/auth"):
+            response = self.client.get(path)
+
+            self.assertEqual(response.status_code, 200, path)
+            self.assertIn("s-maxage", response.headers["Cache-Control"], path)
+            self.assertIn("Cookie", response.headers["Vary"], path)
+
 
 if __name__ == "__main__":
     unittest.main()